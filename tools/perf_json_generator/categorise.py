@@ -1,15 +1,19 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 Arm Limited
 
-import dataclasses
-import json
 import re
 import sys
-from typing import Iterable, Optional
+from typing import Dict, List, Optional
 
 import mrs_data
 
 MNEMONICS_FILENAME = "categories.json"
+DEFAULT_TOPIC = "core-imp-def"
+
+
+def perf_group_name(group_name):
+    """Convert a telemetry group name to the Perf topic name"""
+    return group_name.lower().replace(" ", "-")
 
 
 class EventGrouper():
@@ -18,17 +22,27 @@ class EventGrouper():
 
 
 class ArmDataEventGrouper(EventGrouper):
-    def __init__(self, path_to_group_data=MNEMONICS_FILENAME):
-        with open(path_to_group_data, 'r') as f:
-            group_data = json.load(f)
+    def __init__(self, path_to_group_data=MNEMONICS_FILENAME) -> None:
+        group_data = mrs_data.read_json(path_to_group_data)
 
         self.mnemonic_matches = group_data["events"]
-        self.regex = [(re.compile(r), g) for r, g in group_data["regex"]]
+        # Combine all the expressions into one alternation so each event name is matched in a
+        # single pass. Alternatives are tried in order, so the first matching expression still
+        # wins. The named group that matched maps back to the category. Event names are ASCII, so
+        # skip Unicode matching.
+        self.regex = re.compile("|".join(f"(?P<g{i}>(?:{r}))"
+                                         for i, (r, _) in enumerate(group_data["regex"])),
+                                re.ASCII)
+        self.regex_groups = {f"g{i}": g for i, (_, g) in enumerate(group_data["regex"])}
+        # Many CPUs share event names, so remember the result for each name
+        self.regex_group_cache: Dict[str, Optional[str]] = {}
 
     def regex_group(self, event_name):
-        for r, g in self.regex:
-            if r.fullmatch(event_name):
-                return g
+        if event_name not in self.regex_group_cache:
+            match = self.regex.fullmatch(event_name)
+            self.regex_group_cache[event_name] = self.regex_groups[match.lastgroup] \
+                if match else None
+        return self.regex_group_cache[event_name]
 
     def get_groups(self, event_name, source_file_name):
         specific_group = self.mnemonic_matches.get(event_name)
@@ -49,31 +63,32 @@ class ArmDataEventGrouper(EventGrouper):
 
 
 class TelemetryEventGrouper(EventGrouper):
-    def get_groups(self, event_name, source_file_name):
-        def perf_name(group_name):
-            return group_name.lower().replace(" ", "-")
-
-        group_list = mrs_data.read_telemetry_function_groups(source_file_name)
-        return [perf_name(g) for g in group_list if event_name in group_list[g]["events"]]
+    def __init__(self) -> None:
+        # Source file name -> {event name -> [perf group names]}
+        self.groups_by_event: Dict[str, Dict[str, List[str]]] = {}
+
+    def event_groups(self, source_file_name: str):
+        """Return a dict that maps each event name in the source file to its groups"""
+        if source_file_name not in self.groups_by_event:
+            index: Dict[str, List[str]] = {}
+            group_list = mrs_data.read_telemetry_function_groups(source_file_name)
+            for g, group in group_list.items():
+                for event_name in dict.fromkeys(group["events"]):
+                    index.setdefault(event_name, []).append(perf_group_name(g))
+            self.groups_by_event[source_file_name] = index
+
+        return self.groups_by_event[source_file_name]
+
+    def add_event_groups(self, source_file_name: str, event_groups: Dict[str, List[str]]):
+        """Use groups that were already indexed with event_groups(), e.g. by another process"""
+        self.groups_by_event[source_file_name] = event_groups
 
+    def get_groups(self, event_name, source_file_name):
+        return list(self.event_groups(source_file_name).get(event_name, []))
 
-def add_categories(events: Iterable, event_grouper: Optional[EventGrouper], source_file_name: str):
-    def add_topic(event):
-        """Create new event dict with topics added"""
-        topics = event_grouper.get_groups(event.EventName, source_file_name)
-        return dataclasses.replace(event, Topics=topics)
-
-    # Add core-imp-def topic if no grouping requested
-    if not event_grouper:
-        return [dataclasses.replace(e, Topics=["core-imp-def"]) for e in events]
-
-    output = [add_topic(event) for event in events]
-
-    events_with_no_group = [f'{e.EventName}: {e.BriefDescription}' for e in output if not e.Topics]
-    if events_with_no_group:
-        print('Warning: Not writing events which do not have a group (note that the mnemonic '
-              'printed may differ to the one in the source json if it differs in the common Perf '
-              'files):\n  %s' % "\n  ".join(events_with_no_group))
-        return [dataclasses.replace(e, Topics=["core-imp-def"]) for e in events]
 
-    return output
+def warn_events_with_no_group(events_with_no_group: List[str]):
+    """Warn about events with no group. All events are then given the default topic instead."""
+    print('Warning: Not writing events which do not have a group (note that the mnemonic '
+          'printed may differ to the one in the source json if it differs in the common Perf '
+          'files):\n  %s' % "\n  ".join(events_with_no_group))
@@ -1,71 +1,62 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 Arm Limited
 
+# Event codes are 16-bit, so every range below fits in a 64KiB lookup table
+EVENT_CODE_LIMIT = 0x10000
 
-def is_common(code):
-    # These pmu event number ranges were taken from the Arm V8 architecture
-    # references manual, version G.b, page D7-2875 available at
-    # https://developer.arm.com/documentation/ddi0487/gb/?lang=en
 
-    if isinstance(code, str):
-        code = to_int(code)
+def _code_table(ranges):
+    """Create a lookup table with a non-zero byte for every code in the inclusive ranges"""
+    table = bytearray(EVENT_CODE_LIMIT)
+    for low, high in ranges:
+        table[low:high + 1] = b"\x01" * (high + 1 - low)
+    return bytes(table)
 
-    if code <= 0x003F:
-        return True
-
-    if code >= 0x4000 and code <= 0x403F:
-        return True
-
-    if code >= 0x8000 and code <= 0x80FF:
-        return True
 
+# These pmu event number ranges were taken from the Arm V8 architecture
+# references manual, version G.b, page D7-2875 available at
+# https://developer.arm.com/documentation/ddi0487/gb/?lang=en
+_COMMON = _code_table([
+    (0x0000, 0x003F),
+    (0x4000, 0x403F),
+    (0x8000, 0x80FF),
     # Previously reserved but applies for Armv8.6 onwards
-    if code >= 0x8100 and code <= 0x8124:
-        return True
-
+    (0x8100, 0x8124),
     # Previously reserved but applies for Armv8.6 onwards
-    if code >= 0x8128 and code <= 0x81FF:
-        return True
-
+    (0x8128, 0x81FF),
     # The Arm ARM calls 0x8200-0xC0BF reserved, but defines events up to 0x82A3
-    if code >= 0x8200 and code <= 0x82A3:
-        return True
-
-    return False
+    (0x8200, 0x82A3),
+])
 
+# Since FEAT_PMUv3p8 (Armv8.8), these ranges are now 'common' rather than
+# 'recommended', but they will remain here (and in recommended.json in
+# Perf) in the interest of backwards compatibility.
+_RECOMMENDED = _code_table([
+    (0x0040, 0x00BF),
+    (0x4040, 0x40BF),
+])
 
-def is_recommended(code):
-    # These pmu event number ranges were taken from the Arm V8 architecture
-    # references manual, version G.b, page D7-2875 available at
-    # https://developer.arm.com/documentation/ddi0487/gb/?lang=en
-    #
-    # Since FEAT_PMUv3p8 (Armv8.8), these ranges are now 'common' rather than
-    # 'recommended', but they will remain here (and in recommended.json in
-    # Perf) in the interest of backwards compatibility.
+_IMPDEF = _code_table([
+    (0x00C0, 0x03FF),
+    (0x0400, 0x3FFF),
+    (0xC0C0, 0xFFFF),
+])
 
-    if isinstance(code, str):
-        code = to_int(code)
 
-    if code >= 0x0040 and code <= 0x00BF:
-        return True
+def _lookup(table, code):
+    return 0 <= code < EVENT_CODE_LIMIT and bool(table[code])
 
-    if code >= 0x4040 and code <= 0x40BF:
-        return True
 
-    return False
+def is_common(code: int):
+    return _lookup(_COMMON, code)
 
 
-def is_impdef(event_code):
-    # These pmu event number ranges were taken from the Arm V8 architecture
-    # references manual, version G.b, page D7-2875 available at
-    # https://developer.arm.com/documentation/ddi0487/gb/?lang=en
+def is_recommended(code: int):
+    return _lookup(_RECOMMENDED, code)
 
-    if isinstance(event_code, str):
-        event_code = to_int(event_code)
 
-    return (event_code >= 0x00C0 and event_code <= 0x03FF) or \
-           (event_code >= 0x400 and event_code <= 0x3FFF) or \
-           (event_code >= 0xC0C0 and event_code <= 0xFFFF)
+def is_impdef(event_code: int):
+    return _lookup(_IMPDEF, event_code)
 
 
 def to_int(event_code_str):
@@ -3,18 +3,25 @@
 # Copyright 2022 Arm Limited
 
 import argparse
+import concurrent.futures
 import dataclasses
+import functools
+import heapq
+import io
+import itertools
 import json
 import os
 import sys
 import textwrap
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, List, Optional, OrderedDict, TypeVar
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar, Union
 
 import event_codes
 import mapping
 import mrs_data
-from categorise import ArmDataEventGrouper, TelemetryEventGrouper, add_categories
+from categorise import (DEFAULT_TOPIC, ArmDataEventGrouper, TelemetryEventGrouper,
+                        warn_events_with_no_group)
 from mrs_data import MrsEvent, read_json
 
 CHAIN_EVENT_CODE = 0x1e
@@ -24,8 +31,12 @@ MAPFILE_FILENAME = "mapfile.csv"
 METRICS_FILENAME = "metrics.json"
 METRICS_ADJUSTMENTS_FILENAME = "metrics_adjustments.json"
 
+# Lots of events are held in memory at once, so use slots where they are supported (Python 3.10+)
+# to avoid a __dict__ per instance
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class PerfEvent:
     """Event in Linux Perf format.
 
@@ -39,34 +50,74 @@ class PerfEvent:
     PublicDescription: Optional[str] = None
     # Topics: Internal field, used to hold groups
     Topics: List[str] = dataclasses.field(default_factory=list)
+    # Internal fields derived from EventCode in __post_init__
+    _numeric_code: Optional[int] = dataclasses.field(default=None, init=False, repr=False,
+                                                     compare=False)
+    _common: bool = dataclasses.field(default=False, init=False, repr=False, compare=False)
+    _recommended: bool = dataclasses.field(default=False, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Event codes are used for sorting, indexing and classification many times per event, so
+        # parse the hex string once rather than on every access.
+        if self.EventCode is not None:
+            numeric_code = event_codes.to_int(self.EventCode)
+            object.__setattr__(self, "_numeric_code", numeric_code)
+            object.__setattr__(self, "_common", event_codes.is_common(numeric_code))
+            object.__setattr__(self, "_recommended", event_codes.is_recommended(numeric_code))
 
     @property
     def numeric_code(self):
-        return event_codes.to_int(self.EventCode)
+        return self._numeric_code
 
     @property
     def common(self):
-        return event_codes.is_common(self.numeric_code)
+        return self._common
 
     @property
     def recommended(self):
-        return event_codes.is_recommended(self.numeric_code)
+        return self._recommended
 
     def to_perf_dict(self):
         """Return a dict that represents this event in Perf format.
 
         Used for JSON serialisation.
         """
-        result = OrderedDict()
-        for field in ["ArchStdEvent", "PublicDescription", "EventCode", "EventName",
-                      "BriefDescription"]:
-            value = getattr(self, field)
-            if value is not None:
-                result[field] = value
-        return result
+        fields = (("ArchStdEvent", self.ArchStdEvent),
+                  ("PublicDescription", self.PublicDescription),
+                  ("EventCode", self.EventCode),
+                  ("EventName", self.EventName),
+                  ("BriefDescription", self.BriefDescription))
+        # Plain dicts preserve insertion order, which sets the field order in the output
+        return {field: value for field, value in fields if value is not None}
+
+
+@dataclass(**DATACLASS_SLOTS)
+class MutablePerfEvent:
+    """Mutable counterpart of PerfEvent.
 
+    CPU events are categorised in place while they are processed, then frozen into PerfEvents.
+    """
+    ArchStdEvent: Optional[str] = None
+    EventCode: Optional[str] = None
+    EventName: Optional[str] = None
+    BriefDescription: Optional[str] = None
+    PublicDescription: Optional[str] = None
+    Topics: List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def numeric_code(self):
+        return event_codes.to_int(self.EventCode)
 
-@dataclass(frozen=True)
+    def freeze(self):
+        return PerfEvent(ArchStdEvent=self.ArchStdEvent,
+                         EventCode=self.EventCode,
+                         EventName=self.EventName,
+                         BriefDescription=self.BriefDescription,
+                         PublicDescription=self.PublicDescription,
+                         Topics=self.Topics)
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class PerfMetric:
     """Metric in Linux Perf format."""
     MetricName: str
@@ -81,61 +132,110 @@ class PerfMetric:
 
         Used for JSON serialisation.
         """
-        result = OrderedDict()
-        for field in ["MetricName", "MetricExpr", "BriefDescription", "PublicDescription",
-                      "MetricGroup", "ScaleUnit"]:
-            value = getattr(self, field)
-            if value is not None:
-                result[field] = value
-        return result
+        fields = (("MetricName", self.MetricName),
+                  ("MetricExpr", self.MetricExpr),
+                  ("BriefDescription", self.BriefDescription),
+                  ("PublicDescription", self.PublicDescription),
+                  ("MetricGroup", self.MetricGroup),
+                  ("ScaleUnit", self.ScaleUnit))
+        # Plain dicts preserve insertion order, which sets the field order in the output
+        return {field: value for field, value in fields if value is not None}
+
+
+def index_by_code(events: Iterable[PerfEvent]) -> Dict[int, PerfEvent]:
+    """
+    Return a dict that maps event code to event, for O(1) lookups by event code.
+
+    Events without an event code are skipped. If several events share a code, the first one wins.
+    """
+    index: Dict[int, PerfEvent] = {}
+    for e in events:
+        if e.EventCode is not None:
+            index.setdefault(e.numeric_code, e)
+    return index
 
 
-def find_event_in_list(event: PerfEvent, event_list: List[PerfEvent]):
+def event_code_key(event: PerfEvent):
+    """Sort key that orders events by event code"""
+    return event.numeric_code or 0
+
+
+def sort_by_event_code(events: Iterable[PerfEvent]):
+    return sorted(events, key=event_code_key)
+
+
+def write_if_changed(path: str, text: str):
     """
-    Find an instance of event in event_list (based on event code).
+    Write text to the file at path, unless the file already has exactly that content.
 
-    Return the event from the list if found.
-    Returns None if not found.
+    Leaving unchanged files alone keeps their timestamps, so re-running the script doesn't make
+    Perf's build regenerate its events.
     """
-    assert event.EventCode is not None
-    return next((e for e in event_list if event.numeric_code == e.numeric_code), None)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            if f.read() == text:
+                return
+
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def map_in_processes(func: Callable, items: List, jobs: Optional[int]):
+    """
+    Yield (item, get_result) for each item, in order, where get_result() returns func(item).
+
+    The items are processed in parallel by up to jobs worker processes (one per CPU core if None),
+    so func and its arguments and results must be picklable. Exceptions raised by func are raised
+    from get_result(). With a single job or item everything runs in this process instead.
+    """
+    if jobs == 1 or len(items) <= 1:
+        for item in items:
+            yield item, functools.partial(func, item)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        for item, future in zip(items, futures):
+            yield item, future.result
 
 
 def perf_arm64_path(perf_path: str):
     return os.path.join(perf_path, "pmu-events", "arch", "arm64")
 
 
-def mrs_events_to_perf_events(cpu_events: List[MrsEvent], common_events: List[MrsEvent]):
+def mrs_events_to_perf_events(cpu_events: List[MrsEvent], common_events: List[MrsEvent],
+                              default_topics: Optional[List[str]] = None):
     """
     Read MRS data and return a list of CPU events and corresponding common events.
 
+    CPU events are returned as MutablePerfEvents so they can be processed in place, common events
+    as PerfEvents. CPU events are created with default_topics, if given.
+
     Note: Returned CPU and common events may not map 1:1 as IMPDEF events won't appear in common
     data.
     """
 
     T = TypeVar("T")
 
-    def partition(iterable: Iterable[T], predicate: Callable[[T], bool]):
+    def partition(items: List[T], predicate: Callable[[T], bool]):
         """
         Return two lists. One with items where predicate(item) == true, one with items where
         predicate(item) is false
         """
-        true_list: List[T] = []
-        false_list: List[T] = []
-        for i in iterable:
-            (true_list if predicate(i) else false_list).append(i)
-
-        return (true_list, false_list)
+        mask = [predicate(i) for i in items]
+        return (list(itertools.compress(items, mask)),
+                list(itertools.compress(items, [not m for m in mask])))
 
     def mrs_to_perf_event(event: mrs_data.MrsEvent):
         """Create dict in Perf format from dict in MRS format"""
         def format_code(code):
             return '0x{:>02X}'.format(code) if code is not None else None
 
-        return PerfEvent(PublicDescription=event.description,
-                         EventCode=format_code(event.code),
-                         EventName=event.name,
-                         BriefDescription=event.description)
+        return MutablePerfEvent(PublicDescription=event.description,
+                                EventCode=format_code(event.code),
+                                EventName=event.name,
+                                BriefDescription=event.description,
+                                Topics=list(default_topics or []))
 
     # Some events are defined without names or codes
     # e.g. 0xC0 and last events in
@@ -159,12 +259,12 @@ def mrs_events_to_perf_events(cpu_events: List[MrsEvent], common_events: List[Mr
               file=sys.stderr)
 
     perf_cpu_events = [mrs_to_perf_event(e) for e in cpu_events if e.code != CHAIN_EVENT_CODE]
-    perf_common_events = [mrs_to_perf_event(e) for e in common_events]
+    common_codes = {e.code for e in common_events if e.code is not None}
 
     # List of common events that are present in the specified CPU events
     # (may not be 1:1. e.g. impdef events)
-    present_perf_common_events = [e for e in perf_cpu_events
-                                  if find_event_in_list(e, perf_common_events)]
+    present_perf_common_events = [e.freeze() for e in perf_cpu_events
+                                  if e.numeric_code in common_codes]
 
     return (perf_cpu_events, present_perf_common_events)
 
@@ -204,11 +304,16 @@ class PerfData:
         arm64_dir = perf_arm64_path(perf_path)
 
         common_path = os.path.join(arm64_dir, COMMON_MICROARCH_FILENAME)
-        self.common_microarch_events = [PerfEvent(**e) for e in read_json(common_path)]
+        # Common and recommended events are kept sorted by event code so new events can be merged
+        # in as CPUs are added
+        self.common_microarch_events = sort_by_event_code(PerfEvent(**e)
+                                                          for e in read_json(common_path))
         recomended_path = os.path.join(arm64_dir, RECOMMENDED_FILENAME)
-        self.recommended_events = [PerfEvent(**e) for e in read_json(recomended_path)]
+        self.recommended_events = sort_by_event_code(PerfEvent(**e)
+                                                     for e in read_json(recomended_path))
         self.mapfile = mapping.read_perf_cpu_mappings(os.path.join(arm64_dir, MAPFILE_FILENAME))
-        self.cpu_events = {}
+        # CPU name -> {topic -> events}
+        self.cpu_events_by_topic: Dict[str, Dict[str, List[PerfEvent]]] = {}
         self.metrics = {}
         self.event_grouper = event_grouper
         metrics_adj_file = os.path.join(os.path.dirname(__file__), METRICS_ADJUSTMENTS_FILENAME)
@@ -216,8 +321,9 @@ class PerfData:
 
     def add_cpu(self, mrs_cpu_info: mapping.MidrFields, mrs_cpu_events: List[MrsEvent],
                 mrs_common_events: List[MrsEvent], perf_cpu_name: str, source_file_name: str = ""):
-        def sort_by_event_code(rows: List[PerfEvent]):
-            return sorted(rows, key=lambda e: e.numeric_code or 0)
+        def merge_by_event_code(events: List[PerfEvent], new_events: List[PerfEvent]):
+            """Merge new_events into events, which is already sorted by event code"""
+            return list(heapq.merge(events, sort_by_event_code(new_events), key=event_code_key))
 
         def filter_common(events: List[PerfEvent]):
             return [e for e in events if e.common]
@@ -225,50 +331,47 @@ class PerfData:
         def filter_recommended(events: List[PerfEvent]):
             return [e for e in events if e.recommended]
 
-        def replace_arch_std_event(cpu_events: List[PerfEvent], common_events: List[PerfEvent]):
-            """Replace non-IMPDEF events with "ArchStdEvent" reference to common event"""
-            def replaced_event(event: PerfEvent):
-                common_event = find_event_in_list(event, common_events)
-                if common_event:  # If event exists in common events, include reference instead
-                    return PerfEvent(ArchStdEvent=event.EventName, Topics=event.Topics,
-                                     PublicDescription=event.PublicDescription)
-                else:
-                    assert event_codes.is_impdef(event.EventCode), \
-                           f"{event.EventCode} is unknown and not IMPDEF: {event}"
-                    return event
-
-            return [replaced_event(e) for e in cpu_events]
-
-        def replace_event_name(events: List[PerfEvent], common_events: List[PerfEvent]):
-            """Replace event names where they disagree with common event names.
-
-            Sometimes per-CPU events and common events have different names for the same event code.
-            In this case, update the CPU event with the common name
-            """
-
-            def renamed_event(event: PerfEvent):
-                existing_event = find_event_in_list(event, common_events)
-                if existing_event and existing_event.EventName != event.EventName:
-                    return dataclasses.replace(event, EventName=existing_event.EventName)
-                else:
-                    return event
-
-            return [renamed_event(e) for e in events]
+        def finalize_event(event: MutablePerfEvent, common_index: Dict[int, PerfEvent],
+                           events_with_no_group: List[str]):
+            """Categorise event and replace non-IMPDEF events with reference to common event"""
+            # Must add categories before replacing event names otherwise looking up the categories
+            # by event name doesn't work. Without a grouper events already have the default topic.
+            if self.event_grouper:
+                event.Topics = self.event_grouper.get_groups(event.EventName, source_file_name)
+                if not event.Topics:
+                    events_with_no_group.append(f'{event.EventName}: {event.BriefDescription}')
+
+            common_event = common_index.get(event.numeric_code)
+            if common_event:
+                # If event exists in common events, include "ArchStdEvent" reference instead.
+                # Sometimes per-CPU events and common events have different names for the same
+                # event code. In this case, the reference uses the common name.
+                return PerfEvent(ArchStdEvent=common_event.EventName, Topics=event.Topics,
+                                 PublicDescription=event.PublicDescription)
+            else:
+                assert event_codes.is_impdef(event.numeric_code), \
+                       f"{event.EventCode} is unknown and not IMPDEF: {event}"
+                return event.freeze()
 
         # Ensure we haven't added this CPU already
-        assert perf_cpu_name not in self.cpu_events
+        assert perf_cpu_name not in self.cpu_events_by_topic
 
         # Get processed MRS data (in Perf event format)
+        # Add core-imp-def topic if no grouping requested
+        default_topics = None if self.event_grouper else [DEFAULT_TOPIC]
         cpu_events, present_common_events = mrs_events_to_perf_events(mrs_cpu_events,
-                                                                      mrs_common_events)
+                                                                      mrs_common_events,
+                                                                      default_topics)
 
         # Add common events not present in Perf
+        common_index = index_by_code(self.common_microarch_events)
+        recommended_index = index_by_code(self.recommended_events)
         new_common = [e for e in filter_common(present_common_events)
-                      if not find_event_in_list(e, self.common_microarch_events)]
+                      if e.numeric_code not in common_index]
         new_recommended = [e for e in filter_recommended(present_common_events)
-                           if not find_event_in_list(e, self.recommended_events)]
-        self.common_microarch_events = sort_by_event_code(self.common_microarch_events + new_common)
-        self.recommended_events = sort_by_event_code(self.recommended_events + new_recommended)
+                           if e.numeric_code not in recommended_index]
+        self.common_microarch_events = merge_by_event_code(self.common_microarch_events, new_common)
+        self.recommended_events = merge_by_event_code(self.recommended_events, new_recommended)
 
         # Sanity check: No impdef events in common files
         assert not [e for e in self.common_microarch_events
@@ -276,13 +379,21 @@ class PerfData:
         assert not [e for e in self.recommended_events if event_codes.is_impdef(e.numeric_code)]
 
         # Categorise and store CPU events
-        all_common_perf_events = self.common_microarch_events + self.recommended_events
-        # Must add categories before replacing event names otherwise looking up the categories by
-        # event name doesn't work.
-        cpu_events = add_categories(cpu_events, self.event_grouper, source_file_name)
-        cpu_events = replace_event_name(cpu_events, all_common_perf_events)
-        cpu_events = replace_arch_std_event(cpu_events, all_common_perf_events)
-        self.cpu_events[perf_cpu_name] = cpu_events
+        all_common_index = index_by_code(self.common_microarch_events + self.recommended_events)
+        events_with_no_group: List[str] = []
+        perf_cpu_events = [finalize_event(e, all_common_index, events_with_no_group)
+                           for e in cpu_events]
+        if events_with_no_group:
+            warn_events_with_no_group(events_with_no_group)
+            perf_cpu_events = [dataclasses.replace(e, Topics=[DEFAULT_TOPIC])
+                               for e in perf_cpu_events]
+
+        # Group by topic now, events are written out to one file per topic
+        events_by_topic: Dict[str, List[PerfEvent]] = defaultdict(list)
+        for e in perf_cpu_events:
+            for t in e.Topics:
+                events_by_topic[t].append(e)
+        self.cpu_events_by_topic[perf_cpu_name] = events_by_topic
 
         # Add CPU mapping
         self.mapfile.add_if_not_present(mrs_cpu_info, perf_cpu_name)
@@ -305,26 +416,15 @@ class PerfData:
         self.mapfile.add_if_not_present(mrs_cpu_info, perf_cpu_name)
 
     def write(self, perf_path: str):
-        def write_json(data, path):
-            class PerfJsonEncoder(json.JSONEncoder):
-                """Use to_perf_dict to get data when writing PerfEvent objects"""
-
-                def default(self, object):
-                    if isinstance(object, PerfEvent) or isinstance(object, PerfMetric):
-                        return object.to_perf_dict()
-                    return super().default(object)
-
-            with open(path, 'w') as f:
-                json.dump(data, f, indent=4, cls=PerfJsonEncoder)
-                f.write("\n")  # Perf JSON files tend to have a trailing new line
-
-        def write_by_topic(events: List[PerfEvent], output_dir: str):
-            events_by_topic: Dict[str, List[PerfEvent]] = {}
-
-            for e in events:
-                for t in e.Topics:
-                    events_by_topic.setdefault(t, []).append(e)
-
+        def write_json(data: Iterable[Union[PerfEvent, PerfMetric]], path):
+            # Serialise the whole file in one go and write it with a single call, rather than
+            # letting json.dump issue a write per token. Items are converted with to_perf_dict up
+            # front so the encoder doesn't need to call back into Python for each one.
+            text = json.dumps([item.to_perf_dict() for item in data], indent=4)
+            # Perf JSON files tend to have a trailing new line
+            write_if_changed(path, text + "\n")
+
+        def write_by_topic(events_by_topic: Dict[str, List[PerfEvent]], output_dir: str):
             os.makedirs(output_dir, exist_ok=True)
 
             for topic, events in events_by_topic.items():
@@ -346,10 +446,12 @@ class PerfData:
         write_json(self.common_microarch_events, os.path.join(arm64_path,
                                                               COMMON_MICROARCH_FILENAME))
         write_json(self.recommended_events, os.path.join(arm64_path, RECOMMENDED_FILENAME))
-        self.mapfile.write_fn(os.path.join(arm64_path, MAPFILE_FILENAME))
+        mapfile = io.StringIO()
+        self.mapfile.write(mapfile)
+        write_if_changed(os.path.join(arm64_path, MAPFILE_FILENAME), mapfile.getvalue())
 
-        for cpu, events in self.cpu_events.items():
-            write_by_topic(events, os.path.join(arm64_path, "arm", cpu))
+        for cpu, events_by_topic in self.cpu_events_by_topic.items():
+            write_by_topic(events_by_topic, os.path.join(arm64_path, "arm", cpu))
 
         for cpu, metrics in self.metrics.items():
             write_metrics(metrics, os.path.join(arm64_path, "arm", cpu))
@@ -360,24 +462,43 @@ def do_arm_data_mode(args, perf_data):
                                                                    mrs_data.CPUS_FILENAME))
     mrs_common_events = mrs_data.read_common_events(args.arm_data_path)
 
-    for cpu in args.arm_data_cpus:
+    cpu_names = [cpu.split(":", 1) if ":" in cpu else (cpu, cpu) for cpu in args.arm_data_cpus]
+
+    # Reading each CPU's JSON file is independent, so it is done in parallel. CPUs are still added
+    # to perf_data one at a time and in order, so the output doesn't depend on the workers.
+    read_cpu_events = functools.partial(mrs_data.read_cpu_events, args.arm_data_path)
+    cpu_events = map_in_processes(read_cpu_events, [mrs_cpu for mrs_cpu, _ in cpu_names],
+                                  args.jobs)
+
+    for cpu, (mrs_cpu, perf_cpu), (_, get_cpu_events) in zip(args.arm_data_cpus, cpu_names,
+                                                             cpu_events):
         if args.verbose:
             print(f"Processing {cpu}...")
         try:
-            if ":" in cpu:
-                mrs_cpu, perf_cpu = cpu.split(":", 1)
-            else:
-                mrs_cpu = perf_cpu = cpu
             # From cpus.json
             mrs_cpu_info = mrs_cpu_mappings[mrs_cpu]
             # From CPU's JSON file
-            mrs_cpu_events = mrs_data.read_cpu_events(args.arm_data_path, mrs_cpu)
+            mrs_cpu_events = get_cpu_events()
 
             perf_data.add_cpu(mrs_cpu_info, mrs_cpu_events, mrs_common_events, perf_cpu)
         except Exception as e:
             raise Exception("Exception while processing %s" % cpu) from e
 
 
+def read_telemetry_cpu(json_path: str, group_events: bool):
+    """
+    Return the CPU ID, events, metrics and (if group_events) event groups from a telemetry file.
+
+    Runs in worker processes, so the parsed file isn't cached for later reads in the main process.
+    Everything needed from the file is returned at once instead.
+    """
+    event_groups = TelemetryEventGrouper().event_groups(json_path) if group_events else None
+    return (mapping.read_telemetry_cpu_id(json_path),
+            mrs_data.read_telemetry_events(json_path),
+            mrs_data.read_telemetry_metrics(json_path),
+            event_groups)
+
+
 def do_telemetry_mode(args, perf_data):
     def filter_common(events: List[MrsEvent]):
         return [e for e in events if e.common or e.recommended]
@@ -396,22 +517,29 @@ def do_telemetry_mode(args, perf_data):
         """
         return [dataclasses.replace(e, description=e.title) for e in events]
 
-    for cpu in args.telemetry_files:
+    # Parsing the telemetry files is independent for each CPU, so it is done in parallel. CPUs are
+    # still added to perf_data one at a time and in order, so the output doesn't depend on the
+    # workers.
+    cpu_paths = [cpu.split(":", 1)[0] for cpu in args.telemetry_files]
+    group_events = isinstance(perf_data.event_grouper, TelemetryEventGrouper)
+    read_cpu = functools.partial(read_telemetry_cpu, group_events=group_events)
+
+    for cpu, (cpu_path, get_cpu) in zip(args.telemetry_files,
+                                        map_in_processes(read_cpu, cpu_paths, args.jobs)):
         if args.verbose:
             print(f"Processing {cpu}...")
         try:
+            mrs_cpu_info, mrs_events, mrs_metrics, event_groups = get_cpu()
             if ":" in cpu:
-                cpu, perf_cpu_name = cpu.split(":", 1)
-                mrs_cpu_info = mapping.read_telemetry_cpu_id(cpu)
+                perf_cpu_name = cpu.split(":", 1)[1]
             else:
-                mrs_cpu_info = mapping.read_telemetry_cpu_id(cpu)
                 perf_cpu_name = mrs_cpu_info.name.lower().replace(" ", "-")
 
-            mrs_events = mrs_data.read_telemetry_events(cpu)
-            mrs_metrics = mrs_data.read_telemetry_metrics(cpu)
+            if group_events:
+                perf_data.event_grouper.add_event_groups(cpu_path, event_groups)
 
             common_events = describe_common(filter_common(mrs_events))
-            perf_data.add_cpu(mrs_cpu_info, mrs_events, common_events, perf_cpu_name, cpu)
+            perf_data.add_cpu(mrs_cpu_info, mrs_events, common_events, perf_cpu_name, cpu_path)
             perf_data.add_metrics(mrs_cpu_info, mrs_metrics, perf_cpu_name)
         except Exception as e:
             raise Exception("Exception while processing %s" % cpu) from e
@@ -436,9 +564,15 @@ def main():
                               "'neoverse-n1 ...'. The Perf name can be overriden by "
                               "specifying a new name after a colon like: 'neoverse-n1:cortex-a76'"))
     parser.add_argument("--no-groups", action="store_true", help="Don't group events")
+    parser.add_argument("--jobs", type=int,
+                        help=("Number of worker processes used to read CPU input files. Defaults "
+                              "to the number of CPU cores"))
     parser.add_argument("--verbose", action="store_true")
     args = parser.parse_args()
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
     # Read initial data for arm-data mode
     if args.arm_data_path:
         if args.arm_data_cpus is None:
@@ -6,6 +6,8 @@ import csv
 import json
 from dataclasses import dataclass
 
+import mrs_data
+
 
 def name_to_key(name: str):
     return name.lower().replace(" ", "-")
@@ -37,8 +39,7 @@ def read_perf_cpu_mappings(filename):
 
 
 def read_telemetry_cpu_id(json_path):
-    with open(json_path) as f:
-        prod = json.load(f)["product_configuration"]
+    prod = mrs_data.read_json(json_path)["product_configuration"]
 
     return MidrFields(implementer=int(prod["implementer"], 0),
                       name=prod["product_name"],
@@ -132,13 +133,15 @@ class PerfCpuMappings:
     COLUMN_NAMES = ["family_model", "version", "filename", "event_type"]
 
     def __init__(self, file):
-        lines = file.read().split("\n")
-
         # Assume all comments are at the start of the doc, save them so we can write them out later
-        self.comments = [line for line in lines if line and line[0] == "#"]
-
-        reader = csv.DictReader([line for line in lines if line and line[0] != "#"],
-                                PerfCpuMappings.COLUMN_NAMES)
+        self.comments = []
+        data_lines = []
+        for line in file:
+            line = line.rstrip("\n")
+            if line:
+                (self.comments if line[0] == "#" else data_lines).append(line)
+
+        reader = csv.DictReader(data_lines, PerfCpuMappings.COLUMN_NAMES)
         self.mappings = [PerfCpuMapping(**x) for x in reader]
 
     def add_if_not_present(self, mrs_mapping: MidrFields, perf_name: str = ""):
@@ -166,22 +169,32 @@ class PerfCpuMappings:
     def write(self, file):
         """Writes mappings to the specified file object"""
 
+        min_midr_by_filename = {}
+        for m in self.mappings:
+            min_midr = min_midr_by_filename.get(m.filename)
+            if min_midr is None or m.midr < min_midr:
+                min_midr_by_filename[m.filename] = m.midr
+
         def sort_key(mapping):
             """
             Existing format sorts by MIDR, but groups by filename
 
             Create compound key with min midr matching the filename and midr of current item
             """
-            min_midr = min([x.midr for x in self.mappings if x.filename == mapping.filename])
-            return (min_midr, mapping.midr)
+            return (min_midr_by_filename[mapping.filename], mapping.midr)
 
         if self.comments:
             file.write("\n".join(self.comments))
             file.write("\n")
 
-        writer = csv.writer(file, lineterminator="\n")
-        for mapping in sorted(self.mappings, key=sort_key):
-            writer.writerow(mapping.__dict__.values())
+        def row(mapping):
+            fields = (mapping.family_model, mapping.version, mapping.filename, mapping.event_type)
+            # Fields are joined directly, so make sure none of them would need CSV quoting
+            assert not any(c in field for field in fields for c in ',"\r\n'), \
+                f"Mapping can't be written without quoting: {mapping}"
+            return ",".join(fields) + "\n"
+
+        file.write("".join(row(mapping) for mapping in sorted(self.mappings, key=sort_key)))
 
     def __iter__(self):
         return self.mappings.__iter__()
@@ -1,12 +1,20 @@
 # SPDX-License-Identifier: Apache-2.0
 # Copyright 2022 Arm Limited
 
+import collections
 import dataclasses
 import event_codes
+import functools
 import json
 import os
 from dataclasses import dataclass
-from typing import Optional, Dict, Type, List
+from typing import Optional, Dict, Type, List, Tuple
+
+try:
+    # orjson is optional, it parses the large data files several times faster
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
 
 CPUS_FILENAME = "cpus.json"
 
@@ -38,6 +46,17 @@ class MrsMetric:
     groups: Optional[List[str]] = None
 
 
+_field_names_cache: Dict[Type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: Type) -> Tuple[str, ...]:
+    names = _field_names_cache.get(cls)
+    if names is None:
+        names = tuple(field.name for field in dataclasses.fields(cls))
+        _field_names_cache[cls] = names
+    return names
+
+
 def to_mrs_event(cls: Type, dict: Dict):
     """
     Convert dict to specified data class, ignoring additional fields
@@ -45,8 +64,7 @@ def to_mrs_event(cls: Type, dict: Dict):
     Works with both arm-data style and telemetry entries. One difference is that telemetry has a
     title and a description, but arm-data only has a short description.
     """
-    values = {field.name: dict[field.name]
-              for field in dataclasses.fields(cls) if field.name in dict}
+    values = {name: dict[name] for name in _field_names(cls) if name in dict}
     # Descriptions contain " +ICI " and " +//0 " to represent newline characters.
     if "description" in values:
         values["description"] = values["description"].replace(" +//0 ", "\n") \
@@ -59,11 +77,26 @@ def to_mrs_event(cls: Type, dict: Dict):
     return cls(**values)
 
 
-def read_json(path):
+@functools.lru_cache(maxsize=None)
+def _read_json_cached(path, mtime):
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
     with open(path, 'r') as f:
         return json.load(f)
 
 
+def read_json(path):
+    """
+    Read and parse a JSON file.
+
+    The same files are read several times per CPU (e.g. telemetry events, metrics and groups all
+    come from one file), so results are cached by path and modification time. The returned data is
+    shared between callers and must not be modified.
+    """
+    return _read_json_cached(os.path.abspath(path), os.path.getmtime(path))
+
+
 def read_cpu_events(repository_path, cpu_name):
     cpu_data_path = os.path.join(repository_path, "pmu", cpu_name + ".json")
     cpu_data = read_json(cpu_data_path)
@@ -88,17 +121,20 @@ def read_telemetry_events(json_path):
 
 
 def read_telemetry_metrics(json_path):
-    def assign_group(m, metric_groups):
-        matching_groups = [name for (name, group)
-                           in metric_groups.items() if m.name in group["metrics"]]
-        return dataclasses.replace(m, groups=matching_groups)
-
     json = read_json(json_path)
     metrics = [to_mrs_event(MrsMetric, dict(name=name, **m)) for (name, m)
                in json["metrics"].items()]
 
+    # Index the metric groups by metric once, rather than searching every group for each metric
+    groups_of_metric: Dict[str, List[str]] = collections.defaultdict(list)
+    for (group_name, group) in json["groups"]["metrics"].items():
+        for metric_name in group["metrics"]:
+            metric_groups = groups_of_metric[metric_name]
+            if not metric_groups or metric_groups[-1] != group_name:
+                metric_groups.append(group_name)
+
     # Merge metric groups list with metrics list
-    return [assign_group(m, json["groups"]["metrics"]) for m in metrics]
+    return [dataclasses.replace(m, groups=groups_of_metric.get(m.name, [])) for m in metrics]
 
 
 def read_telemetry_function_groups(json_path):
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2022 Arm Limited
+
+import os
+import sys
+
+import pytest
+
+import generate
+from generate import PerfEvent
+
+
+def test_write_if_changed_creates_file(tmp_path):
+    path = tmp_path / "events.json"
+    generate.write_if_changed(str(path), "[]\n")
+
+    assert path.read_text() == "[]\n"
+
+
+def test_write_if_changed_keeps_unchanged_file(tmp_path):
+    path = tmp_path / "events.json"
+    path.write_text("[]\n")
+    # Date the file back, so a rewrite would be visible in its modification time
+    os.utime(path, (0, 0))
+
+    generate.write_if_changed(str(path), "[]\n")
+
+    assert path.read_text() == "[]\n"
+    assert path.stat().st_mtime == 0
+
+
+def test_write_if_changed_rewrites_changed_file(tmp_path):
+    path = tmp_path / "events.json"
+    path.write_text("[]\n")
+    os.utime(path, (0, 0))
+
+    generate.write_if_changed(str(path), "[{}]\n")
+
+    assert path.read_text() == "[{}]\n"
+    assert path.stat().st_mtime != 0
+
+
+def square(x):
+    if x < 0:
+        raise ValueError(x)
+    return x * x
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_map_in_processes_order(jobs):
+    items = list(range(10))
+    results = [(item, get_result())
+               for item, get_result in generate.map_in_processes(square, items, jobs)]
+
+    assert results == [(x, x * x) for x in items]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_map_in_processes_raises_from_result(jobs):
+    results = generate.map_in_processes(square, [1, -1], jobs)
+
+    _, get_result = next(results)
+    assert get_result() == 1
+    _, get_result = next(results)
+    with pytest.raises(ValueError):
+        get_result()
+
+
+def test_index_by_code():
+    first = PerfEvent(EventCode="0x11", EventName="CPU_CYCLES")
+    duplicate = PerfEvent(EventCode="0x0011", EventName="CPU_CYCLES_ALIAS")
+    no_code = PerfEvent(ArchStdEvent="INST_RETIRED")
+    other = PerfEvent(EventCode="0x8", EventName="INST_RETIRED")
+
+    index = generate.index_by_code([first, duplicate, no_code, other])
+
+    assert index == {0x11: first, 0x8: other}
+    assert index[0x11] is first
+
+
+def test_sort_by_event_code():
+    high = PerfEvent(EventCode="0x4000", EventName="SAMPLE_POP")
+    low = PerfEvent(EventCode="0x8", EventName="INST_RETIRED")
+    no_code = PerfEvent(ArchStdEvent="CPU_CYCLES")
+
+    assert generate.sort_by_event_code([high, low, no_code]) == [no_code, low, high]
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1"])
+def test_invalid_jobs(jobs, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["generate.py", "perf", "--telemetry-files", "n1.json",
+                                      "--jobs", jobs])
+    with pytest.raises(SystemExit) as exit_info:
+        generate.main()
+
+    assert exit_info.value.code == 2
+    assert "--jobs must be at least 1" in capsys.readouterr().err
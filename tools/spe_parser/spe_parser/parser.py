@@ -4,28 +4,47 @@
 
 import argparse
 import gc
+import itertools
 import logging
+import mmap
 import multiprocessing
+import multiprocessing.pool
+import operator
 import os
-import re
-import shutil
 import sys
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from io import BytesIO
-from typing import Tuple
-
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pyarrow as pa
 import pyarrow.csv as pc
 import pyarrow.parquet as pq
 import spe_parser
 import spe_parser.errors as err
 import spe_parser.payload as payload
-from pandas import DataFrame
 from spe_parser.perf_decoder import get_spe_records_regions
-from spe_parser.schema import BRANCH_COLS, LDST_COLS, OTHER_COLS, get_schema_renderer
-from spe_parser.spe_decoder import get_packets
+from spe_parser.schema import (
+    BRANCH_SCHEMA,
+    LDST_SCHEMA,
+    OTHER_SCHEMA,
+    get_schema_renderer,
+)
+from spe_parser.spe_decoder import PKT_TYPE_NAMES, PktType, decode_buffer
 from spe_parser.symbols import init_search_symbols, search_symbols_by_addr_batch
 
-RE_CPU = re.compile(r"\bcpu:\s+(\d+)")
+# Number of records collected before they are converted to Arrow arrays
+DEFAULT_BATCH_SIZE = 65536
 
 
 def args_init():
@@ -54,6 +73,13 @@ def args_init():
         default="parquet",
         help="output file format type, default to parquet",
     )
+    parser.add_argument(
+        "--compression",
+        dest="compression",
+        choices=["zstd", "snappy", "gzip", "none"],
+        default="zstd",
+        help="compression codec of parquet output files, default to zstd",
+    )
     parser.add_argument(
         "-d",
         "--debug",
@@ -92,6 +118,14 @@ def args_init():
         type=int,
         help=f"number of threads used, defaults to {cpu_cnt}",
     )
+    parser.add_argument(
+        "--batch-size",
+        dest="batch_size",
+        default=DEFAULT_BATCH_SIZE,
+        type=int,
+        help="number of records converted to Arrow at once, lower it to use less memory, "
+        f"defaults to {DEFAULT_BATCH_SIZE}",
+    )
     parser.add_argument(
         "-s",
         "--symbols",
@@ -134,11 +168,16 @@ def args_init():
             logging.error("perf.data file is not specified")
             parser.print_help()
             sys.exit(1)
+        if args.batch_size < 1:
+            logging.error("batch size must be at least 1")
+            sys.exit(1)
         return args
     except BaseException:
         sys.exit(1)
 
 
+# Parameters shared by all the region tasks. They are passed to each worker
+# process once, by init_worker(), so only the region itself is sent per task.
 @dataclass
 class RegionTaskParams:
     file_path: str
@@ -147,72 +186,197 @@ class RegionTaskParams:
     parse_other: bool
     parse_symbols: bool
     parse_raw: bool
-    region: dict
-    idx: int
-    temp_folder: str
     concurrency: int
+    batch_size: int = DEFAULT_BATCH_SIZE
+
+
+class RecordColumns:
+    """
+    Collects the output columns of records and converts them to an Arrow table.
+
+    Only the column values of each record are kept, in a tuple, rather than the
+    whole record dict. The table is then built one column at a time, with the
+    column types of the schema, without going through a list of dicts and a
+    pandas DataFrame.
+
+    Every batch_size records, the rows are converted to an Arrow record batch,
+    which is far more compact than the Python objects, so that the memory used
+    for a large region stays bounded.
+    """
 
+    def __init__(self, schema: pa.Schema, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.schema = schema
+        self.batch_size = batch_size
+        self.get_values = operator.itemgetter(*schema.names)
+        self.rows: List[Tuple] = []
+        self.batches: List[pa.RecordBatch] = []
+        self.batches_len = 0
 
-def parse_single_region(task: RegionTaskParams) -> None:
-    branch_recs = []
-    ldst_recs = []
-    other_recs = []
+    def __len__(self) -> int:
+        return self.batches_len + len(self.rows)
 
+    def append(self, record: Dict[str, Any]) -> None:
+        self.rows.append(self.get_values(record))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        columns = zip(*self.rows)
+        batch = pa.record_batch(
+            [
+                pa.array(values, type=field.type)
+                for field, values in zip(self.schema, columns)
+            ],
+            schema=self.schema,
+        )
+        self.batches.append(batch)
+        self.batches_len += len(self.rows)
+        self.rows = []
+
+    def to_table(self) -> pa.Table:
+        self.flush()
+        return pa.Table.from_batches(self.batches, schema=self.schema)
+
+
+# Set up once per worker process by init_worker(): the task parameters and the
+# input file mapped into memory
+worker_task: Optional[RegionTaskParams] = None
+input_file_map: Optional[mmap.mmap] = None
+
+
+def init_worker(task: RegionTaskParams) -> None:
+    # Map the input file once per worker rather than opening, seeking and reading
+    # it for every region. The mappings of all workers share the page cache.
+    global worker_task, input_file_map
+    worker_task = task
     with open(task.file_path, "rb") as f:
-        f.seek(task.region["offset"])
-        spe_f = BytesIO(f.read(task.region["size"]))
-        cpu = task.region["cpu"]
-        unknown_rec = None
-        unknown_rec_cnt = 0
-        record_dict = {}
-        for pkt in get_packets(spe_f):
-            pkt_type, *pkt_value = pkt.split(" ")
-            if pkt_type == "LAT":
-                # two examples of LAT packets:
-                # LAT 1 XLAT
-                # LAT 627 ISSUE
-                if len(pkt_value) != 2:
-                    logging.warning(f"invalid LAT packet: {pkt}")
-                else:
-                    lat_type, lat_cnt = pkt_value[1], pkt_value[0]
-                    record_dict[lat_type] = [lat_cnt]
-                continue
-            record_dict[pkt_type] = pkt_value
-            if pkt_type == "TS" or pkt_type == "END":
+        # empty files can't be mapped
+        if os.fstat(f.fileno()).st_size > 0:
+            input_file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_region(file_path: str, region: dict) -> memoryview:
+    # A view of the region in the mapped file, not a copy of it. Release it
+    # once the region is decoded.
+    offset, size = region["offset"], region["size"]
+    if input_file_map is None:
+        with open(file_path, "rb") as f:
+            f.seek(offset)
+            return memoryview(f.read(size))
+
+    if hasattr(mmap, "MADV_SEQUENTIAL") and size > 0:
+        # the region is read front to back, so let the kernel read ahead.
+        # madvise() needs a page aligned start
+        start = offset - offset % mmap.PAGESIZE
+        input_file_map.madvise(mmap.MADV_SEQUENTIAL, start, offset + size - start)
+    return memoryview(input_file_map)[offset : offset + size]
+
+
+def serialize_table(table: pa.Table) -> bytes:
+    # An Arrow IPC stream is much cheaper to send back to the main process
+    # than a pickled table, and can be read there without copying
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def parse_region_in_worker(region: dict) -> Dict[str, bytes]:
+    assert worker_task is not None, "worker process is not initialized"
+    return parse_single_region(worker_task, region)
+
+
+def imap_bounded(
+    pool: multiprocessing.pool.Pool, func: Callable, items: Iterable, window: int
+) -> Iterator:
+    """
+    Like pool.imap(func, items), yields the results in the order of the items,
+    but submits at most window items ahead of the result being yielded.
+
+    pool.imap() submits all the items at once, so the results that finish
+    ahead of an earlier, slower item pile up in memory until it is done.
+    Here at most window results are held, however the items finish.
+    """
+    items = iter(items)
+    pending: Deque[multiprocessing.pool.AsyncResult] = deque(
+        pool.apply_async(func, (item,)) for item in itertools.islice(items, window)
+    )
+    while pending:
+        result = pending.popleft().get()
+        # keep the workers busy while the result is handled
+        for item in itertools.islice(items, 1):
+            pending.append(pool.apply_async(func, (item,)))
+        yield result
+
+
+def parse_single_region(task: RegionTaskParams, region: dict) -> Dict[str, bytes]:
+    """
+    Parse the SPE records of a region
+
+    Returns:
+        Dict[str, bytes]: the records of each file type ("br", "ldst" or "other")
+        found in the region, as serialized Arrow IPC streams
+    """
+    branch_recs = RecordColumns(BRANCH_SCHEMA, task.batch_size)
+    ldst_recs = RecordColumns(LDST_SCHEMA, task.batch_size)
+    other_recs = RecordColumns(OTHER_SCHEMA, task.batch_size)
+
+    cpu = region["cpu"]
+    unknown_rec = None
+    unknown_rec_cnt = 0
+    record_dict = {}
+    # Where the records of each type are collected, or None if that type
+    # isn't parsed. Looking this up once per record is cheaper than
+    # comparing the record type against every type in turn.
+    columns_by_type = {
+        payload.RecordType.BRANCH: branch_recs if task.parse_br else None,
+        payload.RecordType.LOAD: ldst_recs if task.parse_ldst else None,
+        payload.RecordType.STORE: ldst_recs if task.parse_ldst else None,
+        payload.RecordType.OTHER: other_recs if task.parse_other else None,
+    }
+    record_end = (PktType.TS, PktType.END)
+    with read_region(task.file_path, region) as spe_buf:
+        for pkt_type, pkt_value in decode_buffer(spe_buf):
+            # Packets are already split into their fields, so they can be stored
+            # in the record under their name, e.g. "PC": ["0xffffab47fdb0", "el0", "ns=1"].
+            # Latency packets are stored under their counter name, e.g. "ISSUE": ["627"]
+            record_dict[PKT_TYPE_NAMES[pkt_type]] = pkt_value
+            if pkt_type in record_end:
                 # Each SPE record is terminated by a TS or END packet, so reaching
                 # this point indicates that all packets of a complete
                 # record have been obtained.
                 rec = payload.create_record(record_dict, cpu)
                 record_dict = {}
-                if rec.type == payload.RecordType.BRANCH:
-                    # branch
-                    if task.parse_br:
-                        branch_recs.append(rec.to_dict())
-                elif (
-                    rec.type == payload.RecordType.LOAD
-                    or rec.type == payload.RecordType.STORE
-                ):
-                    # ldst
-                    if task.parse_ldst:
-                        ldst_recs.append(rec.to_dict())
-                elif rec.type == payload.RecordType.OTHER:
-                    # other
-                    if task.parse_other:
-                        other_recs.append(rec.to_dict())
+                rec_type = rec.type
+                if rec_type != payload.RecordType.UNKNOWN:
+                    columns = columns_by_type[rec_type]
+                    if columns is not None:
+                        columns.append(rec.to_dict())
                 else:
                     # unknown(packet due to parsing error)
                     unknown_rec = rec
                     unknown_rec_cnt += 1
 
-        if unknown_rec:
-            logging.debug(
-                f"unknown record count: {unknown_rec_cnt}, last unknown record: {unknown_rec}"
-            )
+    # these run for every region, so let logging format them only
+    # when debug output is enabled
+    if unknown_rec:
         logging.debug(
-            f"extracted {len(branch_recs)}(branch)+{len(ldst_recs)}(ldst) records from cpu:{task.region['cpu']}"
+            "unknown record count: %d, last unknown record: %s",
+            unknown_rec_cnt,
+            unknown_rec,
         )
+    logging.debug(
+        "extracted %d(branch)+%d(ldst) records from cpu:%d",
+        len(branch_recs),
+        len(ldst_recs),
+        cpu,
+    )
+
+    tables = {}
 
-    def store_records(parse_records, records, default_cols, name):
+    def store_records(parse_records, records, name):
         if not parse_records:
             logging.info(f"skip {name} records")
             return
@@ -220,25 +384,139 @@ def parse_single_region(task: RegionTaskParams) -> None:
             logging.info(f"no {name} records found")
             return
 
-        df = DataFrame.from_records(
-            records,
-            columns=default_cols,
-        )
+        table = records.to_table()
         if task.parse_symbols:
-            df["symbol"] = search_symbols_by_addr_batch(
+            # The same PCs are sampled over and over, so only convert and look up
+            # each distinct PC once, then spread the symbols back to all rows
+            pcs = table.column("pc").combine_chunks().dictionary_encode()
+            symbols = search_symbols_by_addr_batch(
                 task.file_path,
-                df["pc"].apply(int, base=16).tolist(),
+                [int(pc, 16) for pc in pcs.dictionary.to_pylist()],
                 task.concurrency,
             )
-        df.to_parquet(
-            os.path.join(task.temp_folder, f"{task.idx}-{name}.parquet"),
-            index=False,
-            engine="pyarrow",
+            table = table.append_column(
+                "symbol", pa.array(symbols, pa.string()).take(pcs.indices)
+            )
+        tables[name] = serialize_table(table)
+
+    store_records(task.parse_ldst, ldst_recs, "ldst")
+    store_records(task.parse_br, branch_recs, "br")
+    store_records(task.parse_other, other_recs, "other")
+    return tables
+
+
+class OutputWriters:
+    """
+    Writes the records of each file type to its output file as the regions
+    are parsed, so that no intermediate files need to be written and read back.
+
+    The output file of a file type is created along with its first records,
+    under a temporary name. commit() gives the files their final names once
+    all the records are written, abort() removes them instead, so a failed
+    run leaves no truncated output behind.
+
+    Each file type has its own writer thread, so the output files are
+    compressed and written concurrently, with the GIL released, while the
+    main process waits for the next regions. A file type has at most one
+    write in flight, which keeps its records in order and bounds the memory
+    held by pending writes.
+    """
+
+    def __init__(
+        self, output_prefix: str, output_type: str, compression: str = "zstd"
+    ) -> None:
+        self.output_prefix = output_prefix
+        self.output_type = output_type
+        self.compression = compression
+        self.writers: Dict[str, Any] = {}
+        self.threads: Dict[str, ThreadPoolExecutor] = {}
+        self.pending_writes: Dict[str, Future] = {}
+        self.closed = False
+
+    def file_name(self, file_type: str) -> str:
+        return f"{self.output_prefix}-{file_type}.{self.output_type}"
+
+    def temp_file_name(self, file_type: str) -> str:
+        return f"{self.file_name(file_type)}.tmp"
+
+    def open_writer(self, file_type: str, schema: pa.Schema):
+        file_name = self.temp_file_name(file_type)
+        logging.info(f"Generating {self.output_type} file: {self.file_name(file_type)}")
+        if self.output_type == "parquet":
+            # zstd compresses about as well as gzip at a fraction of the CPU cost
+            return pq.ParquetWriter(
+                file_name,
+                schema=schema,
+                compression=self.compression,
+                compression_level=3 if self.compression == "zstd" else None,
+                data_page_size=1 << 20,
+            )
+        return pc.CSVWriter(
+            file_name,
+            schema=schema,
+            write_options=pc.WriteOptions(quoting_style="none"),
         )
 
-    store_records(task.parse_ldst, ldst_recs, LDST_COLS, "ldst")
-    store_records(task.parse_br, branch_recs, BRANCH_COLS, "br")
-    store_records(task.parse_other, other_recs, OTHER_COLS, "other")
+    def write(self, file_type: str, records: bytes) -> None:
+        pending_write = self.pending_writes.get(file_type)
+        if pending_write is not None:
+            # raises the exception of the previous write if any
+            pending_write.result()
+        thread = self.threads.get(file_type)
+        if thread is None:
+            thread = ThreadPoolExecutor(max_workers=1)
+            self.threads[file_type] = thread
+        self.pending_writes[file_type] = thread.submit(
+            self.write_records, file_type, records
+        )
+
+    def write_records(self, file_type: str, records: bytes) -> None:
+        table = pa.ipc.open_stream(records).read_all()
+        writer = self.writers.get(file_type)
+        if writer is None:
+            writer = self.open_writer(file_type, table.schema)
+            self.writers[file_type] = writer
+        writer.write_table(table)
+
+    def close(self) -> None:
+        # waits for the pending writes, raising their exception if any,
+        # and closes the output files
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            for pending_write in self.pending_writes.values():
+                pending_write.result()
+        finally:
+            for thread in self.threads.values():
+                thread.shutdown()
+            for writer in self.writers.values():
+                writer.close()
+
+    def commit(self, file_types: List[str]) -> None:
+        self.close()
+        for file_type in file_types:
+            if file_type in self.writers:
+                os.replace(self.temp_file_name(file_type), self.file_name(file_type))
+                logging.info(f"SPE {file_type} trace files created successfully")
+            else:
+                logging.warning(f"No {file_type} records found")
+                logging.warning(
+                    "Please check if related SPE events are enabled in perf record"
+                )
+
+    def abort(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            # the output is discarded anyway, and the error that made the
+            # run fail is the one worth reporting
+            pass
+        for file_type in self.writers:
+            try:
+                os.remove(self.temp_file_name(file_type))
+            except FileNotFoundError:
+                pass
 
 
 def parse(
@@ -249,10 +527,14 @@ def parse(
     parse_symbols: bool,
     parse_raw: bool,
     concurrency: int,
-) -> Tuple[int, str]:
+    output_prefix: str,
+    output_type: str,
+    compression: str = "zstd",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
     """
-    parse() function is used to parse the perf.data and generate a lots
-    of parquet files, each of which contains the formatted SPE records
+    parse() function is used to parse the perf.data and write the formatted
+    SPE records to one output file per type of record
 
     Args:
         file_path (str): perf.data file path
@@ -262,10 +544,13 @@ def parse(
         parse_symbols (bool): whether to add symbol information to the output
         parse_raw (bool): whether to parse raw SPE fill buffer input
         concurrency (int): number of threads used
+        output_prefix (str): file prefix of the output files
+        output_type (str): format of the output files, "parquet" or "csv"
+        compression (str): compression codec of parquet output files
+        batch_size (int): number of records converted to Arrow at once
 
     Returns:
-        Tuple[int, str]: number of SPE records and temporary folder path
-        for intermediate files(parquet)
+        int: number of SPE regions
     """
     if parse_symbols:
         # cache all the data structures used for symbol search in main process
@@ -274,7 +559,17 @@ def parse(
 
     # pre-creating a pool reduces the amount of memory that needs to be
     # copied from the parent process in the child processes
-    pool = multiprocessing.Pool(concurrency)
+    task = RegionTaskParams(
+        file_path=file_path,
+        parse_br=parse_br,
+        parse_ldst=parse_ldst,
+        parse_other=parse_other,
+        parse_symbols=parse_symbols,
+        parse_raw=parse_raw,
+        concurrency=concurrency,
+        batch_size=batch_size,
+    )
+    pool = multiprocessing.Pool(concurrency, initializer=init_worker, initargs=(task,))
 
     regions = []
     if parse_raw:
@@ -291,101 +586,48 @@ def parse(
     gc.collect()
 
     logging.debug(f"SPE regions: {len(regions)}")
-    # temporary folder used for storing intermediate files
-    # remove the folder if the directory exists, as it might contain
-    # files from a previous run (potentially due to a crash)
-    inter_files_dir = f".spe-parser-temp-output-{os.getpid()}"
-    if os.path.exists(inter_files_dir):
-        shutil.rmtree(inter_files_dir)
-    os.makedirs(inter_files_dir)
-
-    # The results can be processed in a random order because the files
-    # generated by the child processes contain the order of the regions.
-    # The subsequent merge_write() will merge them in order
-    # In fact, processing them in a random order can be more efficient
-    # and reduce the overhead needed to ensure the order.
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        size_histogram = Counter(region["size"].bit_length() for region in regions)
+        for bits, count in sorted(size_histogram.items()):
+            logging.debug(f"SPE regions of less than {1 << bits} bytes: {count}")
+
+    file_types = []
+    if parse_br:
+        file_types.append("br")
+    if parse_ldst:
+        file_types.append("ldst")
+    if parse_other:
+        file_types.append("other")
+
+    # Hand the regions out one at a time, so that the child processes are
+    # kept busy even though region sizes vary a lot. The records are
+    # written in the order of the regions, so only a window of regions is
+    # handed out ahead of the one being written, which bounds the parsed
+    # regions held in memory while an earlier one is still being parsed.
+    window = 2 * concurrency
+    writers = OutputWriters(output_prefix, output_type, compression)
+    completed = False
     try:
-        for _ in pool.imap_unordered(
-            parse_single_region,
-            [
-                RegionTaskParams(
-                    file_path=file_path,
-                    parse_br=parse_br,
-                    parse_ldst=parse_ldst,
-                    parse_other=parse_other,
-                    parse_symbols=parse_symbols,
-                    parse_raw=parse_raw,
-                    region=region,
-                    idx=idx,
-                    temp_folder=inter_files_dir,
-                    concurrency=concurrency,
-                )
-                for idx, region in enumerate(regions)
-            ],
-            chunksize=int(len(regions) / concurrency) + 1,
-        ):
-            # try to get the exceptions of child processes if any
-            pass
+        for tables in imap_bounded(pool, parse_region_in_worker, regions, window):
+            for file_type in file_types:
+                if file_type in tables:
+                    writers.write(file_type, tables[file_type])
+        # the last writes can still fail
+        writers.close()
+        completed = True
     except Exception as ex:
         logging.error(f"failed to parse SPE trace file: {ex}")
-        shutil.rmtree(inter_files_dir)
         raise err.ParseRegionError(ex)
     finally:
-        pool.close()
+        if completed:
+            pool.close()
+        else:
+            # the remaining regions would be parsed for nothing
+            pool.terminate()
+            writers.abort()
         pool.join()
-    return len(regions), inter_files_dir
-
-
-def merge_write(
-    region_cnt: int,
-    inter_files_dir: str,
-    ouput_prefix: str,
-    format: str,
-    parse_br: bool,
-    parse_ldst: bool,
-    parse_other: bool,
-):
-    def write_file(file_type, writer_func):
-        source_files = [
-            os.path.join(inter_files_dir, f"{idx}-{file_type}.parquet")
-            for idx in range(region_cnt)
-        ]
-        valid_files = [f for f in source_files if os.path.exists(f)]
-        if not valid_files:
-            logging.warning(f"No {file_type} records found")
-            logging.warning(
-                "Please check if related SPE events are enabled in perf record"
-            )
-            return
-        logging.debug(f"Total records files count: {len(valid_files)}")
-
-        output_file_name = f"{ouput_prefix}-{file_type}.{format}"
-        logging.info(f"Generating {format} file: {output_file_name}")
-        with writer_func(
-            output_file_name, schema=pq.ParquetFile(valid_files[0]).schema_arrow
-        ) as writer:
-            for src in valid_files:
-                writer.write_table(pq.read_table(src))
-        logging.info(f"SPE {file_type} trace files created successfully")
-
-    def writer_parquet(file_name, schema):
-        return pq.ParquetWriter(file_name, schema=schema, compression="gzip")
-
-    def writer_csv(file_name, schema):
-        return pc.CSVWriter(
-            file_name,
-            schema=schema,
-            write_options=pc.WriteOptions(quoting_style="none"),
-        )
-
-    writer_func = writer_parquet if format == "parquet" else writer_csv
-
-    if parse_br:
-        write_file("br", writer_func)
-    if parse_ldst:
-        write_file("ldst", writer_func)
-    if parse_other:
-        write_file("other", writer_func)
+    writers.commit(file_types)
+    return len(regions)
 
 
 def init_logging(debug: bool):
@@ -404,7 +646,7 @@ def main():
     init_logging(args.debug)
     logging.info(f"Processing SPE trace file: {args.file}")
 
-    region_cnt, inter_files_dir = parse(
+    parse(
         args.file,
         args.parse_br,
         args.parse_ldst,
@@ -412,18 +654,9 @@ def main():
         args.parse_symbols,
         args.parse_raw,
         args.concurrency,
+        args.prefix,
+        args.output_type,
+        args.compression,
+        args.batch_size,
     )
     logging.info("SPE trace file processing is completed")
-
-    try:
-        merge_write(
-            region_cnt,
-            inter_files_dir,
-            args.prefix,
-            args.output_type,
-            args.parse_br,
-            args.parse_ldst,
-            args.parse_other,
-        )
-    finally:
-        shutil.rmtree(inter_files_dir)
@@ -2,8 +2,9 @@
 #
 # Copyright (C) Arm Ltd. 2023
 
-from enum import Enum
-from typing import Dict, List
+import functools
+from enum import IntEnum
+from typing import Callable, Dict, List, Tuple
 
 import spe_parser.errors as err
 from spe_parser.schema import (
@@ -13,7 +14,9 @@ from spe_parser.schema import (
 )
 
 
-class RecordType(Enum):
+# an IntEnum hashes and compares as a plain int, which keeps the lookups
+# keyed by record type cheap
+class RecordType(IntEnum):
     LOAD = 0
     STORE = 1
     BRANCH = 2
@@ -21,7 +24,240 @@ class RecordType(Enum):
     UNKNOWN = 4
 
 
+# exception levels of address packets, e.g. "el2" in ["0xffc0c28685447c", "el2", "ns=1"]
+EXCEPTION_LEVEL_MAP = {"el0": 0, "el1": 1, "el2": 2, "el3": 3}
+
+
+@functools.lru_cache(maxsize=1024)
+def el2_address(addr: str) -> str:
+    """add back the 0xff highest bits missing from an EL2 address
+
+    The same addresses are sampled over and over, so the results are cached.
+    """
+    return addr[:2] + "ff" + addr[2:]
+
+
+# The to_dict() methods of the records fill a default record from the
+# packets of an SPE record. Each packet is handled by a function that
+# sets the matching columns, looked up by the packet name in a table
+# per record type. Packets without a handler are ignored.
+
+
+def _set_event(record: dict, v: List[str]) -> None:
+    record["event"] = ":".join(v)
+
+
+def _set_issue_lat(record: dict, v: List[str]) -> None:
+    record["issue_lat"] = int(v[0])
+
+
+def _set_total_lat(record: dict, v: List[str]) -> None:
+    record["total_lat"] = int(v[0])
+
+
+def _set_pc(record: dict, v: List[str]) -> None:
+    # v : 0xffffab47fdb0 el0 ns=1
+    record["pc"] = v[0]
+    record["el"] = EXCEPTION_LEVEL_MAP[v[1]]
+
+
+def _set_ts(record: dict, v: List[str]) -> None:
+    record["ts"] = int(v[0])
+
+
+def _set_context(record: dict, v: List[str]) -> None:
+    record["context"] = v[0]
+
+
+def _set_branch_op(record: dict, v: List[str]) -> None:
+    record["op"] = "B"
+    if len(v) == 0:
+        record["condition"] = False
+        record["indirect"] = False
+    elif len(v) == 1:
+        if v[0] == "COND":
+            record["condition"] = True
+            record["indirect"] = False
+        elif v[0] == "IND":
+            record["condition"] = False
+            record["indirect"] = True
+        else:
+            raise err.InvalidBrOps(f"invalid br ops: {v[0]}")
+    else:
+        raise err.InvalidBrOps(f'invalid other br ops: {" ".join(v)}')
+
+
+def _set_br_tgt(record: dict, v: List[str]) -> None:
+    record["br_tgt"] = v[0]
+    record["br_tgt_lvl"] = EXCEPTION_LEVEL_MAP[v[1]]
+
+
+def _set_pbt(record: dict, v: List[str]) -> None:
+    # SPEv1.2 previous branch address
+    record["pbt"] = v[0]
+    record["pbt_lvl"] = EXCEPTION_LEVEL_MAP[v[1]]
+
+
+def _set_data_source(record: dict, v: List[str]) -> None:
+    record["data_source"] = translate_data_source(v)
+
+
+def _set_xlat_lat(record: dict, v: List[str]) -> None:
+    record["xlat_lat"] = int(v[0])
+
+
+def _set_paddr(record: dict, v: List[str]) -> None:
+    record["paddr"] = v[0]
+
+
+def _set_vaddr(record: dict, v: List[str]) -> None:
+    record["vaddr"] = v[0]
+
+
+def _set_ldst_op(record: dict, op: str, v: List[str]) -> None:
+    record["op"] = op
+    record["ar"] = False
+    record["atomic"] = False
+    record["excl"] = False
+    record["subclass"] = "GP-REG"
+    record["sve_evl"] = 0
+
+    flags = set(v)
+    if "AT" in flags:
+        record["atomic"] = True
+        record["subclass"] = ""
+    if "EXCL" in flags:
+        record["excl"] = True
+        record["subclass"] = ""
+    if "AR" in flags:
+        record["ar"] = True
+        record["subclass"] = ""
+    if "EVLEN" in flags:
+        # evl value is following EVLEN
+        # ST EVLEN 128 PRED
+        record["sve_evl"] = int(v[v.index("EVLEN") + 1])
+        record["subclass"] = "SVE"
+    if "PRED" in flags:
+        record["sve_pred"] = True
+    if "SG" in flags:
+        record["sve_sg"] = True
+    if (
+        not record["atomic"]
+        and not record["ar"]
+        and not record["excl"]
+        and not record["sve_evl"]
+    ):
+        record["subclass"] = v[0]
+
+
+def _set_load_op(record: dict, v: List[str]) -> None:
+    # a store packet takes precedence over a load packet
+    if record["op"] != "ST":
+        _set_ldst_op(record, "LD", v)
+
+
+def _set_store_op(record: dict, v: List[str]) -> None:
+    _set_ldst_op(record, "ST", v)
+
+
+def _set_other_op(record: dict, v: List[str]) -> None:
+    if "COND-SELECT" in v:
+        record["condition"] = True
+    record["subclass"] = "OTHER"
+    record["op"] = "OTHER"
+
+
+def _set_sve_other_op(record: dict, v: List[str]) -> None:
+    # evl value is following EVLEN
+    # SVE-OTHER EVLEN 32 FP
+    if len(v) > 1 and v[0] == "EVLEN":
+        record["sve_evl"] = int(v[1])
+    flags = set(v)
+    if "FP" in flags:
+        record["sve_fp"] = True
+    if "PRED" in flags:
+        record["sve_pred"] = True
+    record["subclass"] = "SVE"
+    record["op"] = "OTHER"
+
+
+# The SPE record for a CAS sample might have some unexpected events set, we should exclude them
+# https://developer.arm.com/documentation/SDEN885747  #1912195
+events_should_not_in_other_record = frozenset(
+    {
+        "REMOTE-ACCESS",
+        "LLC-REFILL",
+        "LLC-ACCESS",
+        "TLB-REFILL",
+        "TLB-ACCESS",
+        "L1D-REFILL",
+        "L1D-ACCESS",
+    }
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def other_record_event(events: Tuple[str, ...]) -> str:
+    """join the events of an other record, without the unexpected ones
+
+    Few combinations of events are sampled, so the results are cached.
+    """
+    return ":".join(sorted(set(events) - events_should_not_in_other_record))
+
+
+def _set_other_event(record: dict, v: List[str]) -> None:
+    record["event"] = other_record_event(tuple(v))
+
+
+PacketHandler = Callable[[dict, List[str]], None]
+
+_COMMON_HANDLERS: Dict[str, PacketHandler] = {
+    "EV": _set_event,
+    "ISSUE": _set_issue_lat,
+    "TOT": _set_total_lat,
+    "PC": _set_pc,
+    "TS": _set_ts,
+    "CONTEXT": _set_context,
+}
+
+_BRANCH_HANDLERS: Dict[str, PacketHandler] = {
+    **_COMMON_HANDLERS,
+    "B": _set_branch_op,
+    "TGT": _set_br_tgt,
+    "PBT": _set_pbt,
+}
+
+_LDST_HANDLERS: Dict[str, PacketHandler] = {
+    **_COMMON_HANDLERS,
+    "DATA-SOURCE": _set_data_source,
+    "XLAT": _set_xlat_lat,
+    "PA": _set_paddr,
+    "VA": _set_vaddr,
+    "LD": _set_load_op,
+    "ST": _set_store_op,
+}
+
+_OTHER_HANDLERS: Dict[str, PacketHandler] = {
+    **_COMMON_HANDLERS,
+    "EV": _set_other_event,
+    "OTHER": _set_other_op,
+    "SVE-OTHER": _set_sve_other_op,
+}
+
+
+def _apply_handlers(
+    record: dict, data: Dict[str, List[str]], handlers: Dict[str, PacketHandler]
+) -> None:
+    for k, v in data.items():
+        handler = handlers.get(k)
+        if handler is not None:
+            handler(record, v)
+
+
 class Record:
+    # a record is created for every SPE record, so skip the instance dict
+    __slots__ = ("data", "cpu")
+
     def __init__(self, data: Dict[str, List[str]], cpu: int) -> None:
         self.data = data
         self.cpu = cpu
@@ -38,59 +274,19 @@ class Record:
 
 
 class BranchRecord(Record):
+    __slots__ = ()
+
     def to_dict(self) -> dict:
         record = get_branch_default_record()
         record["cpu"] = self.cpu
-
-        keys = self.data.keys()
-        if "B" in keys:
-            v = self.data["B"]
-            record["op"] = "B"
-            if len(v) == 0:
-                record["condition"] = False
-                record["indirect"] = False
-            elif len(v) == 1:
-                if v[0] == "COND":
-                    record["condition"] = True
-                    record["indirect"] = False
-                elif v[0] == "IND":
-                    record["condition"] = False
-                    record["indirect"] = True
-                else:
-                    raise err.InvalidBrOps(f"invalid br ops: {v[0]}")
-            else:
-                raise err.InvalidBrOps(f'invalid other br ops: {" ".join(v)}')
-
-        if "EV" in keys:
-            record["event"] = ":".join(self.data["EV"])
-        if "ISSUE" in keys:
-            record["issue_lat"] = int(self.data["ISSUE"][0])
-        if "TOT" in keys:
-            record["total_lat"] = int(self.data["TOT"][0])
-        if "PC" in keys:
-            v = self.data["PC"]
-            record["pc"] = v[0]
-            record["el"] = int(v[1][2:])
-        if "TS" in keys:
-            record["ts"] = int(self.data["TS"][0])
-        if "TGT" in keys:
-            v = self.data["TGT"]
-            record["br_tgt"] = v[0]
-            record["br_tgt_lvl"] = int(v[1][2:])
-        if "PBT" in keys:
-            # SPEv1.2 previous branch address
-            v = self.data["PBT"]
-            record["pbt"] = v[0]
-            record["pbt_lvl"] = int(v[1][2:])
-        if "CONTEXT" in keys:
-            record["context"] = self.data["CONTEXT"][0]
+        _apply_handlers(record, self.data, _BRANCH_HANDLERS)
 
         if record["el"] == 2:
-            record["pc"] = record["pc"][:2] + "ff" + record["pc"][2:]
+            record["pc"] = el2_address(record["pc"])
         if record["br_tgt_lvl"] == 2:
-            record["br_tgt"] = record["br_tgt"][:2] + "ff" + record["br_tgt"][2:]
+            record["br_tgt"] = el2_address(record["br_tgt"])
         if record.get("pbt_lvl") == 2:
-            record["pbt"] = record["pbt"][:2] + "ff" + record["pbt"][2:]
+            record["pbt"] = el2_address(record["pbt"])
 
         return record
 
@@ -100,6 +296,8 @@ class BranchRecord(Record):
 
 
 class LoadRecord(Record):
+    __slots__ = ()
+
     @property
     def type(self) -> RecordType:
         return RecordType.LOAD
@@ -107,97 +305,27 @@ class LoadRecord(Record):
     def to_dict(self) -> dict:
         record = get_ldst_default_record()
         record["cpu"] = self.cpu
-
-        keys = self.data.keys()
-
-        if "DATA-SOURCE" in keys:
-            record["data_source"] = translate_data_source(self.data["DATA-SOURCE"])
-        if "EV" in keys:
-            record["event"] = ":".join(self.data["EV"])
-        if "ISSUE" in keys:
-            record["issue_lat"] = int(self.data["ISSUE"][0])
-        if "TOT" in keys:
-            record["total_lat"] = int(self.data["TOT"][0])
-        if "XLAT" in keys:
-            record["xlat_lat"] = int(self.data["XLAT"][0])
-        if "PA" in keys:
-            record["paddr"] = self.data["PA"][0]
-        if "PC" in keys:
-            v = self.data["PC"]
-            # v : 0xffffab47fdb0 el0 ns=1
-            record["pc"] = v[0]
-            record["el"] = int(v[1][2:])
-        if "TS" in keys:
-            record["ts"] = int(self.data["TS"][0])
-        if "VA" in keys:
-            record["vaddr"] = self.data["VA"][0]
-        if "ST" in keys or "LD" in keys:
-            k = "ST" if "ST" in keys else "LD"
-            v = self.data[k]
-            record["op"] = k
-            record["ar"] = False
-            record["atomic"] = False
-            record["excl"] = False
-            record["subclass"] = "GP-REG"
-            record["sve_evl"] = 0
-
-            vstr = " ".join(v)
-            if "AT" in vstr:
-                record["atomic"] = True
-                record["subclass"] = ""
-            if "EXCL" in vstr:
-                record["excl"] = True
-                record["subclass"] = ""
-            if "AR" in vstr:
-                record["ar"] = True
-                record["subclass"] = ""
-            if "EVLEN" in vstr:
-                # evl value is following EVLEN
-                # ST EVLEN 128 PRED
-                record["sve_evl"] = int(v[v.index("EVLEN") + 1])
-                record["subclass"] = "SVE"
-            if "PRED" in vstr:
-                record["sve_pred"] = True
-            if "SG" in vstr:
-                record["sve_sg"] = True
-            if (
-                not record["atomic"]
-                and not record["ar"]
-                and not record["excl"]
-                and not record["sve_evl"]
-            ):
-                record["subclass"] = v[0]
-        if "CONTEXT" in keys:
-            record["context"] = self.data["CONTEXT"][0]
+        _apply_handlers(record, self.data, _LDST_HANDLERS)
 
         if record["el"] == 2:
             # The PC and Vaddr are missing the 0xff from the highest bits
-            record["pc"] = record["pc"][:2] + "ff" + record["pc"][2:]
-            record["vaddr"] = record["vaddr"][:2] + "ff" + record["vaddr"][2:]
+            record["pc"] = el2_address(record["pc"])
+            record["vaddr"] = el2_address(record["vaddr"])
 
         return record
 
 
 class StoreRecord(LoadRecord):
+    __slots__ = ()
+
     @property
     def type(self) -> RecordType:
         return RecordType.STORE
 
 
-# The SPE record for a CAS sample might have some unexpected events set, we should exclude them
-# https://developer.arm.com/documentation/SDEN885747  #1912195
-events_should_not_in_other_record = {
-    "REMOTE-ACCESS",
-    "LLC-REFILL",
-    "LLC-ACCESS",
-    "TLB-REFILL",
-    "TLB-ACCESS",
-    "L1D-REFILL",
-    "L1D-ACCESS",
-}
-
-
 class OtherRecord(Record):
+    __slots__ = ()
+
     @property
     def type(self) -> RecordType:
         return RecordType.OTHER
@@ -205,47 +333,10 @@ class OtherRecord(Record):
     def to_dict(self) -> dict:
         record = get_other_default_record()
         record["cpu"] = self.cpu
-        keys = self.data.keys()
-
-        if "OTHER" in keys:
-            vstr = " ".join(self.data["OTHER"])
-            if "COND-SELECT" in vstr:
-                record["condition"] = True
-            record["subclass"] = "OTHER"
-            record["op"] = "OTHER"
-        if "SVE-OTHER" in keys:
-            v = self.data["SVE-OTHER"]
-            # evl value is following EVLEN
-            # SVE-OTHER EVLEN 32 FP
-            if len(v) > 1 and v[0] == "EVLEN":
-                record["sve_evl"] = int(v[1])
-            vstr = " ".join(v)
-            if "FP" in vstr:
-                record["sve_fp"] = True
-            if "PRED" in vstr:
-                record["sve_pred"] = True
-            record["subclass"] = "SVE"
-            record["op"] = "OTHER"
-        if "EV" in keys:
-            record["event"] = ":".join(
-                sorted(set(self.data["EV"]) - events_should_not_in_other_record)
-            )
-
-        if "ISSUE" in keys:
-            record["issue_lat"] = int(self.data["ISSUE"][0])
-        if "TOT" in keys:
-            record["total_lat"] = int(self.data["TOT"][0])
-        if "PC" in keys:
-            v = self.data["PC"]
-            record["pc"] = v[0]
-            record["el"] = int(v[1][2:])
-        if "TS" in keys:
-            record["ts"] = int(self.data["TS"][0])
-        if "CONTEXT" in keys:
-            record["context"] = self.data["CONTEXT"][0]
+        _apply_handlers(record, self.data, _OTHER_HANDLERS)
 
         if record["el"] == 2:
-            record["pc"] = record["pc"][:2] + "ff" + record["pc"][2:]
+            record["pc"] = el2_address(record["pc"])
 
         return record
 
@@ -257,14 +348,14 @@ def create_record(data: Dict[str, List[str]], cpu: int) -> Record:
     # for example: "LD","ST" only in load/store packets
     # "B" only in branch packets, "OTHER" and "SVE-OTHER" only in other packets
 
-    keys = list(data.keys())
-    if "LD" in keys:
+    # look the keys up in the dict itself, rather than scanning a list of them
+    if "LD" in data:
         return LoadRecord(data, cpu)
-    elif "ST" in keys:
+    elif "ST" in data:
         return StoreRecord(data, cpu)
-    elif "B" in keys:
+    elif "B" in data:
         return BranchRecord(data, cpu)
-    elif "OTHER" in keys or "SVE-OTHER" in keys:
+    elif "OTHER" in data or "SVE-OTHER" in data:
         return OtherRecord(data, cpu)
     else:
         return Record(data, cpu)
@@ -294,6 +385,7 @@ def translate_data_source(values: List[str]) -> str:
     """
     if len(values) > 1:
         raise err.InvalidDataSource(f"invalid source packet: {values}")
-    if values[0] not in DATASOURCE_MAP:
+    source = DATASOURCE_MAP.get(values[0])
+    if source is None:
         raise err.InvalidDataSource(f"invalid sourve value: {values[0]}")
-    return DATASOURCE_MAP[values[0]]
+    return source
@@ -9,12 +9,15 @@
 #   https://github.com/torvalds/linux/blob/master/tools/perf/Documentation/perf.data-file-format.txt
 
 import logging
+import os
+import struct
 from functools import lru_cache
-from typing import Any, Dict, List, Set, Tuple
+from typing import Any, BinaryIO, Dict, List, Optional, Set, Tuple
 
 from construct import (
     Aligned,
     BitStruct,
+    Check,
     CString,
     Enum,
     Flag,
@@ -26,6 +29,7 @@ from construct import (
     Padding,
     Pointer,
     PrefixedArray,
+    Seek,
     Struct,
     Switch,
     Tell,
@@ -73,6 +77,24 @@ perf_header_string_list = Struct(
     ),
 )
 
+# index of the AUXTRACE events, written by perf record when it stops
+perf_auxtrace_index = Struct(
+    "offset" / Int64un,
+    "size" / Int64un,
+    "pointer"
+    / Pointer(
+        lambda this: this.offset,
+        "entries"
+        / PrefixedArray(
+            Int64un,  # u64 nr
+            Struct(
+                "file_offset" / Int64un,  # offset of the AUXTRACE event
+                "sz" / Int64un,
+            ),
+        ),
+    ),
+)
+
 # flags bits. A 256-bit bitmap has been set to indicate the optional features
 # that are included in the current perf.data file
 feature_flags = BitStruct(
@@ -92,12 +114,12 @@ feature_flags = BitStruct(
     "HEADER_TOTAL_MEM" / Flag,  # KB
     "HEADER_CPUID" / Flag,
     "HEADER_CPUDESC" / Flag,  # 8
-    "HEADER_AUXTRACE " / Flag,
-    "HEADER_STAT" / Flag,
-    "HEADER_CACHE" / Flag,
-    "HEADER_SAMPLE_TIME" / Flag,
-    "HEADER_SAMPLE_TOPOLOGY" / Flag,
     "HEADER_CLOCKID" / Flag,
+    "HEADER_MEM_TOPOLOGY" / Flag,
+    "HEADER_SAMPLE_TIME" / Flag,
+    "HEADER_CACHE" / Flag,
+    "HEADER_STAT" / Flag,
+    "HEADER_AUXTRACE" / Flag,
     "HEADER_GROUP_DESC" / Flag,
     "HEADER_PMU_MAPPINGS" / Flag,  # 16
     "HEADER_PMU_CAPS" / Flag,
@@ -128,6 +150,17 @@ features = Struct(
     "CPUID" / If(lambda this: this._.flags.HEADER_CPUID, perf_header_string),
     "TOTAL_MEM" / If(lambda this: this._.flags.HEADER_TOTAL_MEM, perf_file_section),
     "CMDLINE" / If(lambda this: this._.flags.HEADER_CMDLINE, perf_header_string_list),
+    "EVENT_DESC" / If(lambda this: this._.flags.HEADER_EVENT_DESC, perf_file_section),
+    "CPU_TOPOLOGY"
+    / If(lambda this: this._.flags.HEADER_CPU_TOPOLOGY, perf_file_section),
+    "NUMA_TOPOLOGY"
+    / If(lambda this: this._.flags.HEADER_NUMA_TOPOLOGY, perf_file_section),
+    "BRANCH_STACK"
+    / If(lambda this: this._.flags.HEADER_BRANCH_STACK, perf_file_section),
+    "PMU_MAPPINGS"
+    / If(lambda this: this._.flags.HEADER_PMU_MAPPINGS, perf_file_section),
+    "GROUP_DESC" / If(lambda this: this._.flags.HEADER_GROUP_DESC, perf_file_section),
+    "AUXTRACE" / If(lambda this: this._.flags.HEADER_AUXTRACE, perf_auxtrace_index),
 )
 
 # The definition of single perf event, currently only parses AUXTRACE
@@ -145,6 +178,9 @@ perf_event = Struct(
     ),
     "misc" / Int16un,
     "size" / Int16un,
+    # an event can not be smaller than its header. Seek would step back
+    # over it, so stop parsing events there, e.g. past the data section
+    Check(lambda this: this.size >= 8),
     "end" / Tell,
     "data"
     / Switch(
@@ -158,7 +194,9 @@ perf_event = Struct(
                 "tid" / Int32un,
                 "cpu" / Int32un,
                 "reserved__" / Int32un,
-                "realData" / Padding(lambda this: this.auxsize),  # SPE records
+                # SPE records, seeked over rather than read as they are
+                # decoded separately
+                "realData" / Seek(lambda this: this.auxsize, 1),
             ),
             "MMAP": Struct(
                 "pid" / Int32un,
@@ -187,7 +225,7 @@ perf_event = Struct(
                 Padding(lambda this: this._.size - (this.end2 - this._.start)),
             ),
         },
-        Padding(lambda this: this.size - (this.end - this.start)),
+        Seek(lambda this: this.size - (this.end - this.start), 1),
     ),
 )
 
@@ -209,6 +247,23 @@ perf_data = Struct(
 )
 
 
+# The AUXTRACE events are read with plain struct unpacking rather than
+# through perf_event, as a trace holds one per AUX buffer and only a few
+# of their fields are needed.
+# struct perf_event_header { u32 type; u16 misc; u16 size; }
+perf_event_header_struct = struct.Struct("<IHH")
+# struct auxtrace_event without the header: size, offset, reference,
+# idx, tid and cpu
+auxtrace_event_struct = struct.Struct("<QQQIII")
+PERF_RECORD_AUXTRACE = 71
+__auxtrace_event_size = perf_event_header_struct.size + auxtrace_event_struct.size
+
+
+@lru_cache(maxsize=2)
+def __parse_perf_header(perf_path: str) -> Any:
+    return perf_header.parse_file(perf_path)
+
+
 @lru_cache(maxsize=2)
 def __parse_perf_data(perf_path: str) -> Any:
     return perf_data.parse_file(perf_path)
@@ -225,28 +280,88 @@ def get_spe_records_regions(perf_path: str) -> List[Dict]:
     After obtaining the SPE records regions, the spe_decoder can be
     used to parse the SPE binary content into a readable version
     """
-    spe_regions = []
-    parsed_data = __parse_perf_data(perf_path)
+    header = __parse_perf_header(perf_path)
+    file_size = os.path.getsize(perf_path)
 
     # log some metadata in perf.data
-    logging.debug(f"size: {parsed_data.header.data.size}")
-    logging.debug(f"hostname: {parsed_data.header.feature.HOSTNAME.pointer.str}")
-    logging.debug(f"os: {parsed_data.header.feature.OSRELEASE.pointer.str}")
-    logging.debug(f"perf version: {parsed_data.header.feature.VERSION.pointer.str}")
-    logging.debug(f"arch: {parsed_data.header.feature.ARCH.pointer.str}")
-    logging.debug(
-        f"cmdline: {' '.join(x.str for x in parsed_data.header.feature.CMDLINE.pointer)}"
+    logging.debug(f"size: {header.data.size}")
+    logging.debug(f"hostname: {header.feature.HOSTNAME.pointer.str}")
+    logging.debug(f"os: {header.feature.OSRELEASE.pointer.str}")
+    logging.debug(f"perf version: {header.feature.VERSION.pointer.str}")
+    logging.debug(f"arch: {header.feature.ARCH.pointer.str}")
+    logging.debug(f"cmdline: {' '.join(x.str for x in header.feature.CMDLINE.pointer)}")
+
+    with open(perf_path, "rb") as f:
+        if header.feature.AUXTRACE is not None and header.feature.AUXTRACE.pointer:
+            # jump straight to the AUXTRACE events listed in the index
+            offsets = sorted(e.file_offset for e in header.feature.AUXTRACE.pointer)
+            spe_regions = __read_indexed_regions(f, offsets, file_size)
+            if spe_regions is not None:
+                return spe_regions
+            logging.debug("invalid AUXTRACE index, scan the events instead")
+        return __scan_regions(f, header.data.offset, header.data.size, file_size)
+
+
+def __get_region(buf: bytes, offset: int, file_size: int) -> Optional[Dict]:
+    # the SPE records region following the AUXTRACE event read in buf
+    if len(buf) < __auxtrace_event_size:
+        return None
+    _, _, size = perf_event_header_struct.unpack_from(buf)
+    auxsize, _, _, _, _, cpu = auxtrace_event_struct.unpack_from(
+        buf, perf_event_header_struct.size
     )
+    if offset + size + auxsize > file_size:
+        # the SPE records of the last event are cut short in truncated
+        # files, e.g. when perf was killed
+        logging.debug(f"skip truncated SPE records at offset {offset}")
+        return None
+    # SPE records are stored right after the AUXTRACE event
+    return {"offset": offset + size, "size": auxsize, "cpu": cpu}
 
-    for evt in parsed_data.event:
-        if evt.type == "AUXTRACE":
-            spe_regions.append(
-                {
-                    "offset": evt.start + evt.size,
-                    "size": evt.data.auxsize,
-                    "cpu": evt.data.cpu,
-                }
-            )
+
+def __read_indexed_regions(
+    f: BinaryIO, offsets: List[int], file_size: int
+) -> Optional[List[Dict]]:
+    spe_regions = []
+    for offset in offsets:
+        f.seek(offset)
+        buf = f.read(__auxtrace_event_size)
+        if len(buf) < perf_event_header_struct.size:
+            return None
+        evt_type, _, _ = perf_event_header_struct.unpack_from(buf)
+        if evt_type != PERF_RECORD_AUXTRACE:
+            return None
+        region = __get_region(buf, offset, file_size)
+        if region is None:
+            break
+        spe_regions.append(region)
+    return spe_regions
+
+
+def __scan_regions(
+    f: BinaryIO, data_offset: int, data_size: int, file_size: int
+) -> List[Dict]:
+    spe_regions = []
+    offset = data_offset
+    end = data_offset + data_size
+    while offset < end:
+        f.seek(offset)
+        buf = f.read(__auxtrace_event_size)
+        if len(buf) < perf_event_header_struct.size:
+            break
+        evt_type, _, size = perf_event_header_struct.unpack_from(buf)
+        if size == 0:
+            # corrupted event, the following ones can not be located
+            logging.debug(f"stop at empty event at offset {offset}")
+            break
+        if evt_type != PERF_RECORD_AUXTRACE:
+            offset += size
+            continue
+        region = __get_region(buf, offset, file_size)
+        if region is None:
+            break
+        spe_regions.append(region)
+        offset = region["offset"] + region["size"]
     return spe_regions
 
 
@@ -3,7 +3,9 @@
 # Copyright (C) Arm Ltd. 2023
 
 import pydoc
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
 
 __spe_parser_schema: Dict[str, Any] = {
     "cpu": {
@@ -277,6 +279,26 @@ OTHER_COLS = [
 ]
 
 
+__ARROW_TYPES = {
+    int: pa.int64(),
+    bool: pa.bool_(),
+    str: pa.string(),
+}
+
+
+def __gen_arrow_schema(cols: List[str]) -> pa.Schema:
+    return pa.schema(
+        [(col, __ARROW_TYPES[__spe_parser_schema[col]["type"]]) for col in cols]
+    )
+
+
+# Arrow schemas of the output files, built once rather than inferred from
+# the records of every region
+LDST_SCHEMA = __gen_arrow_schema(LDST_COLS)
+BRANCH_SCHEMA = __gen_arrow_schema(BRANCH_COLS)
+OTHER_SCHEMA = __gen_arrow_schema(OTHER_COLS)
+
+
 def __gen_default_record(cols) -> Dict[str, Any]:
     ret: Dict[str, Any] = {}
     for col in cols:
@@ -290,16 +312,23 @@ def __gen_default_record(cols) -> Dict[str, Any]:
     return ret
 
 
+# Default records are requested for every SPE record, so they are generated
+# once and copied, which is much cheaper than generating them again
+__BRANCH_DEFAULT_RECORD = __gen_default_record(BRANCH_COLS)
+__LDST_DEFAULT_RECORD = __gen_default_record(LDST_COLS)
+__OTHER_DEFAULT_RECORD = __gen_default_record(OTHER_COLS)
+
+
 def get_branch_default_record() -> Dict[str, Any]:
-    return __gen_default_record(BRANCH_COLS)
+    return __BRANCH_DEFAULT_RECORD.copy()
 
 
 def get_ldst_default_record() -> Dict[str, Any]:
-    return __gen_default_record(LDST_COLS)
+    return __LDST_DEFAULT_RECORD.copy()
 
 
 def get_other_default_record() -> Dict[str, Any]:
-    return __gen_default_record(OTHER_COLS)
+    return __OTHER_DEFAULT_RECORD.copy()
 
 
 def get_schema_renderer():
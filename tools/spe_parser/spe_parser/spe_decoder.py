@@ -8,13 +8,14 @@
 #   https://developer.arm.com/documentation/ddi0487/latest/
 
 import logging
-from functools import lru_cache
-from typing import BinaryIO, Generator, Optional
+import re
+import struct
+from enum import IntEnum
+from typing import BinaryIO, Callable, Generator, List, Optional, Tuple
 
 import spe_parser.errors as err
 
 
-@lru_cache(maxsize=32)
 def gen_mask(high: int, low: int) -> int:
     # generate a bitmask with bits set from low to high
     # e.g., get_mask(4, 2) = 0001_1100
@@ -48,6 +49,18 @@ HEADER_SHORT_MASK2 = gen_mask(7, 2)
 HEADER_SHORT_CONTEXT = bytes_to_int(b"\x64")
 HEADER_SHORT_OP_TYPE = bytes_to_int(b"\x48")
 
+# finds the end of a run of padding bytes
+NON_PAD_BYTE = re.compile(rb"[^\x00]")
+
+# little-endian payload readers, indexed by the size field of the header.
+# 1-byte payloads are read by indexing the buffer instead
+PAYLOAD_UNPACKERS = (
+    None,
+    struct.Struct("<H").unpack_from,
+    struct.Struct("<I").unpack_from,
+    struct.Struct("<Q").unpack_from,
+)
+
 HEADER_EXTENDED = bytes_to_int(b"\x20")
 HEADER_EXTENDED_ALIGNMENT = bytes_to_int(b"\x00")
 
@@ -63,8 +76,53 @@ def get_short_header_index(h: int) -> int:
     return h & 7
 
 
+# The masks used when decoding packets are computed once here, rather
+# than by calling gen_mask() and lshift() for every packet
+HEADER_EXTENDED_INDEX_MASK = gen_mask(1, 0)
+
+
 def get_extended_header_index(h0: int, h1: int) -> int:
-    return (h0 & gen_mask(1, 0)) << 3 | get_short_header_index(h1)
+    return (h0 & HEADER_EXTENDED_INDEX_MASK) << 3 | get_short_header_index(h1)
+
+
+class PktType(IntEnum):
+    """Type of a decoded SPE packet.
+
+    The value indexes PKT_TYPE_NAMES, which holds the name the packet is
+    known by in the text format (and in the record data of payload.py).
+    """
+
+    END = 0
+    TS = 1
+    EV = 2
+    DATA_SOURCE = 3
+    CONTEXT = 4
+    # Operation type packets, one per operation class
+    LD = 5
+    ST = 6
+    B = 7
+    OTHER = 8
+    SVE_OTHER = 9
+    # Address packets
+    PC = 10
+    TGT = 11
+    VA = 12
+    PA = 13
+    PBT = 14
+    # Counter packets
+    TOT = 15
+    ISSUE = 16
+    XLAT = 17
+    # Operation type packet with a reserved operation class
+    RESERVED_OP = 18
+
+
+PKT_TYPE_NAMES = tuple(
+    "" if t == PktType.RESERVED_OP else t.name.replace("_", "-") for t in PktType
+)
+
+# A decoded packet is its type and its fields, e.g. (PktType.PC, ["0xaaaae4a9b600", "el0", "ns=1"])
+Packet = Tuple[PktType, List[str]]
 
 
 # Address packet
@@ -73,49 +131,55 @@ PKT_ADDRESS_INDEX_BRANCH = bytes_to_int(b"\x01")
 PKT_ADDRESS_INDEX_DATA_VIRT = bytes_to_int(b"\x02")
 PKT_ADDRESS_INDEX_DATA_PHYS = bytes_to_int(b"\x03")
 PKT_ADDRESS_INDEX_PREV_BRANCH = bytes_to_int(b"\x04")
-PKT_ADDRESS_NAME = {
-    PKT_ADDRESS_INDEX_INS: "PC",
-    PKT_ADDRESS_INDEX_BRANCH: "TGT",
-    PKT_ADDRESS_INDEX_DATA_VIRT: "VA",
-    PKT_ADDRESS_INDEX_DATA_PHYS: "PA",
+# the packet types indexed by the address packet index
+PKT_ADDRESS_TYPE = (
+    PktType.PC,  # PKT_ADDRESS_INDEX_INS
+    PktType.TGT,  # PKT_ADDRESS_INDEX_BRANCH
+    PktType.VA,  # PKT_ADDRESS_INDEX_DATA_VIRT
+    PktType.PA,  # PKT_ADDRESS_INDEX_DATA_PHYS
     # Arm SPEv1.2 adds a new optional address packet type: previous branch
     # target. The recorded address is the target virtual address of the most
     # recently taken branch in program order
-    PKT_ADDRESS_INDEX_PREV_BRANCH: "PBT",
-}
+    PktType.PBT,  # PKT_ADDRESS_INDEX_PREV_BRANCH
+)
+
+
+PKT_ADDRESS_ADDR_MASK = gen_mask(55, 0)
+PKT_ADDRESS_EL_MASK = gen_mask(62, 61)
+PKT_ADDRESS_PAT_MASK = gen_mask(59, 56)
 
 
 def get_pkt_address_addr(v: int) -> int:
-    return v & gen_mask(55, 0)
+    return v & PKT_ADDRESS_ADDR_MASK
 
 
 def get_pkt_address_ns(v: int) -> int:
-    return int(bool((v & lshift(63)) >> 63))
+    return (v >> 63) & 1
 
 
 def get_pkt_address_el(v: int) -> int:
-    return (v & gen_mask(62, 61)) >> 61
+    return (v & PKT_ADDRESS_EL_MASK) >> 61
 
 
 def get_pkt_address_ch(v: int) -> int:
-    return int(bool(v & lshift(62)) >> 62)
+    return (v >> 62) & 1
 
 
 def get_pkt_address_pat(v: int) -> int:
-    return (v & gen_mask(59, 56)) >> 56
+    return (v & PKT_ADDRESS_PAT_MASK) >> 56
 
 
 # Context packet
+PKT_CONTEXT_INDEX_MASK = gen_mask(1, 0)
+
+
 def get_pkt_context_index(h: int) -> int:
-    return h & gen_mask(1, 0)
+    return h & PKT_CONTEXT_INDEX_MASK
 
 
 # Counter packet
-PKT_COUNTER_TYPE = {
-    bytes_to_int(b"\x00"): "TOT",
-    bytes_to_int(b"\x01"): "ISSUE",
-    bytes_to_int(b"\x02"): "XLAT",
-}
+# the packet types indexed by the counter packet index
+PKT_COUNTER_TYPE = (PktType.TOT, PktType.ISSUE, PktType.XLAT)
 
 # Events Packet
 PKT_EVENTS_TYPE = {
@@ -134,11 +198,20 @@ PKT_EVENTS_TYPE = {
     lshift(17): "SVE-PARTIAL-PRED",  # EV_PARTIAL_PREDICATE
     lshift(18): "SVE-EMPTY-PRED",  # EV_EMPTY_PREDICATE
 }
+# the bits of all the events above
+PKT_EVENTS_MASK = sum(PKT_EVENTS_TYPE)
+# the event names indexed by bit position, for iterating over the set bits only
+PKT_EVENTS_NAMES = tuple(
+    PKT_EVENTS_TYPE.get(lshift(bit), "") for bit in range(PKT_EVENTS_MASK.bit_length())
+)
 
 
 # Operation packet header
+PKT_OPERATION_INDEX_MASK = gen_mask(1, 0)
+
+
 def get_pkt_operation_index(h: int) -> int:
-    return h & gen_mask(1, 0)
+    return h & PKT_OPERATION_INDEX_MASK
 
 
 PKT_OPERATION_CLASS_OTHER = bytes_to_int(b"\x00")
@@ -155,8 +228,11 @@ def pkt_operation_class_sve_other(v: int) -> int:
 PKT_OPERATION_COND = lshift(0)
 
 
+PKT_OPERATION_LDST_SUBCLASS_MASK = gen_mask(7, 1)
+
+
 def get_pkt_operation_ldst_subclass(v: int) -> int:
-    return v & gen_mask(7, 1)
+    return v & PKT_OPERATION_LDST_SUBCLASS_MASK
 
 
 PKT_OPERATION_LDST_GP_REG = bytes_to_int(b"\x00")
@@ -167,9 +243,22 @@ PKT_OPERATION_LDST_MTE_TAG = bytes_to_int(b"\x14")
 PKT_OPERATION_LDST_MEMCPY = bytes_to_int(b"\x20")
 PKT_OPERATION_LDST_MEMSET = bytes_to_int(b"\x25")
 
+PKT_OPERATION_LDST_SUBCLASS_NAMES = {
+    PKT_OPERATION_LDST_SIMD_FP: "SIMD-FP",
+    PKT_OPERATION_LDST_GP_REG: "GP-REG",
+    PKT_OPERATION_LDST_UNSPEC_REG: "UNSPEC-REG",
+    PKT_OPERATION_LDST_NV_SYSREG: "NV-SYSREG",
+    PKT_OPERATION_LDST_MTE_TAG: "MTE-TAG",
+    PKT_OPERATION_LDST_MEMCPY: "MEMCPY",
+    PKT_OPERATION_LDST_MEMSET: "MEMSET",
+}
+
+
+PKT_OPERATION_LDST_ATOMIC_MASK = gen_mask(7, 5) | lshift(1)
+
 
 def is_pkt_operation_ldst_atomic(v: int) -> bool:
-    return (v & (gen_mask(7, 5) | lshift(1))) == 2
+    return (v & PKT_OPERATION_LDST_ATOMIC_MASK) == 2
 
 
 PKT_OPERATION_SG = lshift(7)  # Gather/scatter load/store
@@ -178,210 +267,269 @@ PKT_OPERATION_EXCL = lshift(3)  # Exclusive
 PKT_OPERATION_AT = lshift(2)  # Atomic load/store
 PKT_OPERATION_ST = lshift(0)  # Store/Load
 
+# in the order they are printed
+PKT_OPERATION_ATOMIC_FLAGS = (
+    (PKT_OPERATION_AT, "AT"),
+    (PKT_OPERATION_EXCL, "EXCL"),
+    (PKT_OPERATION_AR, "AR"),
+)
+
+
+PKT_OPERATION_LDST_SVE_MASK = lshift(3) | lshift(1)
+PKT_OPERATION_SVE_EVL_MASK = gen_mask(6, 4)
+
 
 def is_pkt_operation_ldst_sve(v: int) -> bool:
-    return (v & (lshift(3) | lshift(1))) == 8
+    return (v & PKT_OPERATION_LDST_SVE_MASK) == 8
 
 
 def PKT_OPERATION_SVE_EVL(v: int) -> int:
-    return 32 << ((v & gen_mask(6, 4)) >> 4)
+    return 32 << ((v & PKT_OPERATION_SVE_EVL_MASK) >> 4)
 
 
 PKT_OPERATION_SVE_PRED = lshift(2)
 PKT_OPERATION_SVE_FP = lshift(1)
 
 
+PKT_OPERATION_BRANCH_MASK = gen_mask(7, 1)
+
+
 def is_pkt_operation_indirect_branch(v: int) -> int:
-    return (v & gen_mask(7, 1)) == 2
+    return (v & PKT_OPERATION_BRANCH_MASK) == 2
 
 
-def spe_get_end(hdr: int, fh: BinaryIO) -> str:
+def spe_get_end(hdr: int) -> Packet:
     """End packet characteristics are:
     - Defines the end of a record if a Timestamp packet is not present.
     - 8-bit packet (on payload).
     """
-    return "END"
+    return PktType.END, []
 
 
-def spe_get_timestamp(hdr: int, fh: BinaryIO) -> str:
-    payload = spe_get_payload(hdr, None, fh)
-    return f"TS {payload}"
+def spe_get_timestamp(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
+    return PktType.TS, [str(payload)]
 
 
-def spe_get_events(hdr: int, fh: BinaryIO) -> str:
-    payload = spe_get_payload(hdr, None, fh)
+def spe_get_events(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
     events = []
-    for k in PKT_EVENTS_TYPE:
-        if payload & k:
-            events.append(PKT_EVENTS_TYPE[k])
-    return f"EV {' '.join(events)}"
+    payload &= PKT_EVENTS_MASK
+    # lowest bit first, so the events are in the order of PKT_EVENTS_TYPE
+    while payload:
+        bit = payload & -payload
+        events.append(PKT_EVENTS_NAMES[bit.bit_length() - 1])
+        payload ^= bit
+    return PktType.EV, events
 
 
-def spe_get_source(hdr: int, fh: BinaryIO) -> str:
-    payload = spe_get_payload(hdr, None, fh)
-    return f"DATA-SOURCE {payload}"
+def spe_get_source(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
+    return PktType.DATA_SOURCE, [str(payload)]
 
 
-def spe_get_context(hdr: int, fh: BinaryIO) -> str:
+def spe_get_context(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
     index = get_pkt_context_index(hdr)
-    payload = spe_get_payload(hdr, None, fh)
-    return f"CONTEXT {hex(payload)} el{index+1}"
+    return PktType.CONTEXT, [hex(payload), f"el{index+1}"]
 
 
-def spe_get_op_type(hdr: int, fh: BinaryIO) -> str:
+def spe_get_op_type(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
     index = get_pkt_operation_index(hdr)
-    payload = spe_get_payload(hdr, None, fh)
     ops = []
     if index == PKT_OPERATION_CLASS_OTHER:
         if pkt_operation_class_sve_other(payload):
-            ops.append("SVE-OTHER")
+            pkt_type = PktType.SVE_OTHER
             # SVE effective vector length
-            ops.append(f"EVLEN {PKT_OPERATION_SVE_EVL(payload)}")
+            ops.append("EVLEN")
+            ops.append(str(PKT_OPERATION_SVE_EVL(payload)))
             if payload & PKT_OPERATION_SVE_FP:
                 ops.append("FP")
             if payload & PKT_OPERATION_SVE_PRED:
                 ops.append("PRED")
         else:
-            ops.append("OTHER")
+            pkt_type = PktType.OTHER
             if payload & PKT_OPERATION_COND:
                 ops.append("COND-SELECT")
             else:
                 ops.append("INSN-OTHER")
     elif index == PKT_OPERATION_CLASS_LD_ST_ATOMIC:
         if payload & 1:
-            ops.append("ST")
+            pkt_type = PktType.ST
         else:
-            ops.append("LD")
+            pkt_type = PktType.LD
         if is_pkt_operation_ldst_atomic(payload):
-            if payload & PKT_OPERATION_AT:
-                ops.append("AT")
-            if payload & PKT_OPERATION_EXCL:
-                ops.append("EXCL")
-            if payload & PKT_OPERATION_AR:
-                ops.append("AR")
-        subclass = get_pkt_operation_ldst_subclass(payload)
-        if subclass == PKT_OPERATION_LDST_SIMD_FP:
-            ops.append("SIMD-FP")
-        elif subclass == PKT_OPERATION_LDST_GP_REG:
-            ops.append("GP-REG")
-        elif subclass == PKT_OPERATION_LDST_UNSPEC_REG:
-            ops.append("UNSPEC-REG")
-        elif subclass == PKT_OPERATION_LDST_NV_SYSREG:
-            ops.append("NV-SYSREG")
-        elif subclass == PKT_OPERATION_LDST_MTE_TAG:
-            ops.append("MTE-TAG")
-        elif subclass == PKT_OPERATION_LDST_MEMCPY:
-            ops.append("MEMCPY")
-        elif subclass == PKT_OPERATION_LDST_MEMSET:
-            ops.append("MEMSET")
+            for bit, name in PKT_OPERATION_ATOMIC_FLAGS:
+                if payload & bit:
+                    ops.append(name)
+        subclass = PKT_OPERATION_LDST_SUBCLASS_NAMES.get(
+            get_pkt_operation_ldst_subclass(payload)
+        )
+        if subclass:
+            ops.append(subclass)
         if is_pkt_operation_ldst_sve(payload):
             # SVE effective vector length
-            ops.append(f"EVLEN {PKT_OPERATION_SVE_EVL(payload)}")
+            ops.append("EVLEN")
+            ops.append(str(PKT_OPERATION_SVE_EVL(payload)))
             if payload & PKT_OPERATION_SVE_PRED:
                 ops.append("PRED")
             if payload & PKT_OPERATION_SG:
                 ops.append("SG")
     elif index == PKT_OPERATION_CLASS_BR_ERET:
-        ops.append("B")
+        pkt_type = PktType.B
         if payload & PKT_OPERATION_COND:
             ops.append("COND")
         if is_pkt_operation_indirect_branch(payload):
             ops.append("IND")
-    return f"{' '.join(ops)}"
+    else:
+        pkt_type = PktType.RESERVED_OP
+    return pkt_type, ops
 
 
-def spe_get_addr(hdr: int, ext_hdr: Optional[int], fh: BinaryIO) -> str:
+def spe_get_addr(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
     if ext_hdr:
         index = get_extended_header_index(hdr, ext_hdr)
     else:
         index = get_short_header_index(hdr)
-    payload = spe_get_payload(hdr, ext_hdr, fh)
-    ns = get_pkt_address_ns(payload)
-    el = get_pkt_address_el(payload)
-    ch = get_pkt_address_ch(payload)
-    pat = get_pkt_address_pat(payload)
-    addr = get_pkt_address_addr(payload)
+    # The fields are split inline from the payload rather than with the
+    # get_pkt_address_* accessors, and only for the packets that have them
     if index in (
         PKT_ADDRESS_INDEX_INS,
         PKT_ADDRESS_INDEX_BRANCH,
         PKT_ADDRESS_INDEX_PREV_BRANCH,
     ):
-        return f"{PKT_ADDRESS_NAME[index]} {hex(addr)} el{el} ns={ns}"
+        return PKT_ADDRESS_TYPE[index], [
+            hex(payload & PKT_ADDRESS_ADDR_MASK),
+            f"el{(payload >> 61) & 3}",
+            f"ns={payload >> 63}",
+        ]
     elif index == PKT_ADDRESS_INDEX_DATA_VIRT:
-        return f"VA {hex(payload)}"
+        return PktType.VA, [hex(payload)]
     elif index == PKT_ADDRESS_INDEX_DATA_PHYS:
-        return f"PA {hex(addr)} ns={ns} ch={ch} pat={pat}"
+        return PktType.PA, [
+            hex(payload & PKT_ADDRESS_ADDR_MASK),
+            f"ns={payload >> 63}",
+            f"ch={(payload >> 62) & 1}",
+            f"pat={(payload >> 56) & 0xF}",
+        ]
     raise err.InvalidAddrPacket()
 
 
-def spe_get_counter(hdr: int, ext_hdr: Optional[int], fh: BinaryIO) -> str:
+def spe_get_counter(hdr: int, ext_hdr: Optional[int], payload: int) -> Packet:
     if ext_hdr:
         index = get_extended_header_index(hdr, ext_hdr)
     else:
         index = get_short_header_index(hdr)
-    payload = spe_get_payload(hdr, ext_hdr, fh)
-    return f"LAT {payload} {PKT_COUNTER_TYPE[index]}"
-
-
-def spe_get_payload(hdr: int, ext_hdr: Optional[int], fh: BinaryIO) -> int:
-    if ext_hdr:
-        payload_len = 1 << ((ext_hdr & 48) >> 4)
-    else:
-        payload_len = 1 << ((hdr & 48) >> 4)
-    payload = fh.read(payload_len)
-    if payload_len == 1:
-        return ord(payload)
-    else:
-        return bytes_to_int(payload)
-
-
-def get_packets(fh: BinaryIO) -> Generator:
-    # Parse all SPE packets from the given file.
-    while True:
-        buf = fh.read(1)
-        if not buf:
-            break
-        hdr = ord(buf)
-        ext_hdr = None
-        # We cannot use the if-else structure here because when dealing
-        # with the extended header, we may need to enter two conditional statements
+    return PKT_COUNTER_TYPE[index], [str(payload)]
+
+
+def decode_packets(fh: BinaryIO) -> Generator[Packet, None, None]:
+    # Decode all SPE packets from the given file.
+    yield from decode_buffer(fh.read())
+
+
+# The decoders of the packets with a payload, all called with the header,
+# the extended header flag and the payload.
+PacketDecoder = Callable[[int, Optional[int], int], Packet]
+
+
+def __get_short_packet_decoder(hdr: int) -> Optional[PacketDecoder]:
+    # Padding, end and extended headers are handled by decode_buffer()
+    if hdr == HEADER_SHORT_TIMESTAMP:
+        return spe_get_timestamp
+    if (hdr & HEADER_SHORT_MASK1) == HEADER_SHORT_EVENTS:
+        return spe_get_events
+    if (hdr & HEADER_SHORT_MASK1) == HEADER_SHORT_SOURCE:
+        return spe_get_source
+    if (hdr & HEADER_SHORT_MASK2) == HEADER_SHORT_CONTEXT:
+        return spe_get_context
+    if (hdr & HEADER_SHORT_MASK2) == HEADER_SHORT_OP_TYPE:
+        return spe_get_op_type
+    return __get_extended_packet_decoder(hdr)
+
+
+def __get_extended_packet_decoder(hdr: int) -> Optional[PacketDecoder]:
+    # The address and counter packets do not require differentiation
+    # between short and long formats
+    if (hdr & HEADER_MASK3) == HEADER_ADDRESS:
+        return spe_get_addr
+    if (hdr & HEADER_MASK3) == HEADER_COUNTER:
+        return spe_get_counter
+    return None
+
+
+# The decoder of each header byte, None for invalid headers. Looking it up
+# is cheaper than testing the header against each packet format in turn
+SHORT_PACKET_DECODERS = tuple(__get_short_packet_decoder(hdr) for hdr in range(256))
+# The decoder of each byte following an extended header
+EXTENDED_PACKET_DECODERS = tuple(
+    __get_extended_packet_decoder(hdr) for hdr in range(256)
+)
+
+
+def decode_buffer(buf: bytes) -> Generator[Packet, None, None]:
+    # Decode all SPE packets from the given buffer.
+    # The buffer is walked with a cursor, rather than read from a file
+    # object a byte or a payload at a time.
+    pos = 0
+    size = len(buf)
+    while pos < size:
+        hdr = buf[pos]
+        pos += 1
         if hdr == HEADER_SHORT_PAD:
+            if pos < size and buf[pos] == HEADER_SHORT_PAD:
+                # skip a run of padding in one scan rather than a byte per
+                # iteration. Single padding bytes are cheaper to step over
+                m = NON_PAD_BYTE.search(buf, pos)
+                pos = m.start() if m else size
             continue
         if hdr == HEADER_SHORT_END:
-            yield spe_get_end(hdr, fh)
-            continue
-        if hdr == HEADER_SHORT_TIMESTAMP:
-            yield spe_get_timestamp(hdr, fh)
-            continue
-        if (hdr & HEADER_SHORT_MASK1) == HEADER_SHORT_EVENTS:
-            yield spe_get_events(hdr, fh)
-            continue
-        if (hdr & HEADER_SHORT_MASK1) == HEADER_SHORT_SOURCE:
-            yield spe_get_source(hdr, fh)
-            continue
-        if (hdr & HEADER_SHORT_MASK2) == HEADER_SHORT_CONTEXT:
-            yield spe_get_context(hdr, fh)
-            continue
-        if (hdr & HEADER_SHORT_MASK2) == HEADER_SHORT_OP_TYPE:
-            yield spe_get_op_type(hdr, fh)
+            yield spe_get_end(hdr)
             continue
         if (hdr & HEADER_SHORT_MASK2) == HEADER_EXTENDED:
             # 16-bit extended format header
             # need to update the value of HDR and then determine whether
             # it belongs to an extended address or a counter packet.
-            ext_hdr = 1
-            hdr = ord(fh.read(1))
+            ext_hdr: Optional[int] = 1
+            hdr = buf[pos]
+            pos += 1
             if hdr == HEADER_EXTENDED_ALIGNMENT:
                 logging.warning(
                     "alignment packet has been removed in Armv8.5. skip for now"
                 )
                 continue
-        # The address and counter packets do not require differentiation
-        # between short and long formats
-        if (hdr & HEADER_MASK3) == HEADER_ADDRESS:
-            yield spe_get_addr(hdr, ext_hdr, fh)
-            continue
-        if (hdr & HEADER_MASK3) == HEADER_COUNTER:
-            yield spe_get_counter(hdr, ext_hdr, fh)
-            continue
-        raise err.SPEBadPacket()
+            decoder = EXTENDED_PACKET_DECODERS[hdr]
+            size_field = (ext_hdr & 48) >> 4
+        else:
+            ext_hdr = None
+            decoder = SHORT_PACKET_DECODERS[hdr]
+            size_field = (hdr & 48) >> 4
+        if decoder is None:
+            raise err.SPEBadPacket()
+
+        # All the other packets have a payload, whose size is given by
+        # the header
+        payload_len = 1 << size_field
+        if payload_len == 1:
+            payload = buf[pos]
+        elif pos + payload_len <= size:
+            payload = PAYLOAD_UNPACKERS[size_field](buf, pos)[0]
+        else:
+            # truncated at the end of the buffer
+            payload = int.from_bytes(buf[pos : pos + payload_len], "little")
+        pos += payload_len
+        yield decoder(hdr, ext_hdr, payload)
+
+
+def format_packet(pkt: Packet) -> str:
+    # Format a decoded packet the way `perf report -D` prints it,
+    # e.g. "PC 0xaaaae4a9b600 el0 ns=1", "LAT 4 ISSUE" or "EV RETIRED"
+    pkt_type, fields = pkt
+    name = PKT_TYPE_NAMES[pkt_type]
+    if pkt_type in (PktType.TOT, PktType.ISSUE, PktType.XLAT):
+        return f"LAT {fields[0]} {name}"
+    if pkt_type == PktType.EV:
+        return f"EV {' '.join(fields)}"
+    return " ".join([name, *fields])
+
+
+def get_packets(fh: BinaryIO) -> Generator[str, None, None]:
+    # Parse all SPE packets from the given file, in text format.
+    for pkt in decode_packets(fh):
+        yield format_packet(pkt)
@@ -6,25 +6,39 @@
 import logging
 import multiprocessing
 import os
-from bisect import bisect_right
+import struct
+from array import array
 from functools import lru_cache
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+import numpy as np
 from elftools.common.exceptions import ELFError
 from elftools.elf.elffile import ELFFile
 from spe_parser.perf_decoder import get_mmap_records
 
 
-def __decode_elf_symbols(
-    binary_path: str, base_addr: int
-) -> Dict[int, Tuple[str, int]]:
-    symbols = {}
+# Elf64_Sym and Elf32_Sym, without the byte order. Only the name offset,
+# info, value and size fields are unpacked, the others are padding
+ELF64_SYM_FORMAT = "IB1x2xQQ"
+ELF32_SYM_FORMAT = "IIIB1x2x"
+STT_FUNC = 2
+
+# The symbols of a binary as parallel sequences: start addresses, end
+# addresses and names. They are sent back from the worker processes, and
+# flat sequences are much cheaper to pickle than a dict of tuples
+ElfSymbols = Tuple["array[int]", "array[int]", List[str]]
+
+
+def __decode_elf_symbols(binary_path: str, base_addr: int) -> ElfSymbols:
+    start_addrs = array("Q")
+    end_addrs = array("Q")
+    names: List[str] = []
     with open(binary_path, "rb") as file:
         try:
             elffile = ELFFile(file)
         except ELFError:
             logging.warning(f"symbols: file {binary_path} is not an ELF")
-            return symbols
+            return start_addrs, end_addrs, names
         # Some libraries will have .symtab deleted, so when it cannot be obtained
         # try to read .dynsym instead
         tab = elffile.get_section_by_name(".symtab") or elffile.get_section_by_name(
@@ -32,37 +46,75 @@ def __decode_elf_symbols(
         )
         if not tab:
             logging.warning(f"symbols: no symbol table found in file {binary_path}")
-            return {}
+            return start_addrs, end_addrs, names
         object = binary_path.split("/")[-1]
-        for symbol in tab.iter_symbols():
+        # Unpack the raw symbol entries at once, rather than through
+        # iter_symbols(), which builds a container for each symbol
+        endian = "<" if elffile.little_endian else ">"
+        is_elf64 = elffile.elfclass == 64
+        sym_struct = struct.Struct(
+            endian + (ELF64_SYM_FORMAT if is_elf64 else ELF32_SYM_FORMAT)
+        )
+        strtab = tab.stringtable.data()
+        data = tab.data()
+        entries = sym_struct.iter_unpack(
+            data[: len(data) - len(data) % sym_struct.size]
+        )
+        if not is_elf64:
+            # Elf32_Sym has the info field after the value and size
+            entries = ((n, i, v, sz) for n, v, sz, i in entries)
+        for name_off, info, value, size in entries:
             # skip non-function and zero-size symbols
-            if symbol["st_info"]["type"] != "STT_FUNC":
+            if info & 0xF != STT_FUNC:
                 continue
-            if symbol["st_size"] == 0:
+            if size == 0:
                 continue
-            # {start_addr: (symbol_name, end_addr), ...}
-            # some symbols may have alias, so we need to remove the duplicates
-            symbols[base_addr + symbol["st_value"]] = (
-                f"[{object}] {symbol.name}",
-                base_addr + symbol["st_size"] + symbol["st_value"],
-            )
+            name = strtab[name_off : strtab.find(b"\0", name_off)]
+            start_addrs.append(base_addr + value)
+            end_addrs.append(base_addr + size + value)
+            names.append(f"[{object}] {name.decode('utf-8', errors='replace')}")
+
+    return start_addrs, end_addrs, names
 
-    return symbols
+
+def __decode_elf_symbols_in_worker(record: Tuple[str, int]) -> ElfSymbols:
+    return __decode_elf_symbols(*record)
+
+
+def __list_files(dirname: str) -> Optional[Set[str]]:
+    # the names of the files in a directory, following symlinks, so that
+    # dangling ones are left out. None if the directory can't be listed
+    try:
+        with os.scandir(dirname) as it:
+            return {entry.name for entry in it if entry.is_file()}
+    except OSError:
+        return None
 
 
 def get_mmap_loaded_symbols(
     perf_path: str, concurrency: int
 ) -> Dict[int, Tuple[str, int]]:
-    records = []
     # filter out the records that we are not interested in
-    for rec in get_mmap_records(perf_path):
-        binary_path, _ = rec
-        if not binary_path.startswith("/"):
-            continue
-        if binary_path.endswith(".ko"):
-            continue
-        if not os.path.exists(binary_path):
-            logging.debug(f"symbols: {binary_path} file not found")
+    candidates = [
+        rec
+        for rec in get_mmap_records(perf_path)
+        if rec[0].startswith("/") and not rec[0].endswith(".ko")
+    ]
+    # list each directory once instead of a stat call per record
+    dir_files: Dict[str, Optional[Set[str]]] = {}
+    records = []
+    for rec in candidates:
+        dirname, basename = os.path.split(rec[0])
+        if dirname not in dir_files:
+            dir_files[dirname] = __list_files(dirname)
+        files = dir_files[dirname]
+        if files is None:
+            # e.g. a directory that can be searched but not read
+            found = os.path.exists(rec[0])
+        else:
+            found = basename in files
+        if not found:
+            logging.debug("symbols: %s file not found", rec[0])
             continue
         records.append(rec)
 
@@ -70,8 +122,13 @@ def get_mmap_loaded_symbols(
 
     pool = multiprocessing.Pool(concurrency)
     symbols = {}
-    for s in pool.starmap_async(__decode_elf_symbols, records).get():
-        symbols.update(s)
+    # merge the symbols of each binary as soon as they are decoded
+    for start_addrs, end_addrs, names in pool.imap_unordered(
+        __decode_elf_symbols_in_worker, records
+    ):
+        # {start_addr: (symbol_name, end_addr), ...}
+        # some symbols may have alias, so we need to remove the duplicates
+        symbols.update(zip(start_addrs, zip(names, end_addrs)))
     pool.close()
     pool.join()
     logging.debug(f"symbols: mmap loaded symbols total counts: {len(symbols)}")
@@ -130,8 +187,8 @@ def get_kernel_symbols() -> Dict[int, Tuple[str, int]]:
 @lru_cache(maxsize=2)
 def init_search_symbols(
     perf_path: str, concurrency: int
-) -> Tuple[List[int], Dict[int, Tuple[str, int]]]:
-    # prepare and cache all the data structures used for bisect for better performance
+) -> Tuple[np.ndarray, Dict[int, Tuple[str, int]]]:
+    # prepare and cache all the data structures used for the binary search for better performance
     logging.info("symbols: start to parse all symbols")
     # {start_addr: (symbol_name, end_addr), ...}
     symbols = get_mmap_loaded_symbols(perf_path, concurrency)
@@ -140,7 +197,8 @@ def init_search_symbols(
         symbols.update(kernel_symbols)
     logging.info(f"symbols: total counts: {len(symbols)}")
     return (
-        sorted(symbols.keys()),
+        # kernel addresses don't fit in an int64
+        np.array(sorted(symbols.keys()), dtype=np.uint64),
         symbols,
     )
 
@@ -148,19 +206,24 @@ def init_search_symbols(
 def search_symbols_by_addr_batch(
     perf_path: str, addr_list: List[int], concurrency: int
 ) -> List[str]:
-    start_addr_list, all_symbols = init_search_symbols(perf_path, concurrency)
+    start_addrs, all_symbols = init_search_symbols(perf_path, concurrency)
+    start_addrs = np.asarray(start_addrs, dtype=np.uint64)
 
     addr_symbol_map = {}
-    for addr in set(addr_list):
-        # binary search to find the closest start address
-        tgt = bisect_right(start_addr_list, addr)
-        if tgt == 0:
-            continue
-        # bisect_right returns the rightmost index to insert, so we need to minus 1
-        start_addr = start_addr_list[tgt - 1]
-        symbol_name, end_addr = all_symbols[start_addr]
-        if start_addr <= addr <= end_addr:
-            addr_symbol_map[addr] = symbol_name
+    unique_addrs = list(set(addr_list))
+    if len(start_addrs) and unique_addrs:
+        # binary search all the addresses at once to find the closest start addresses.
+        # searchsorted returns the rightmost index to insert, so we need to minus 1
+        tgt = np.searchsorted(
+            start_addrs, np.array(unique_addrs, dtype=np.uint64), side="right"
+        )
+        closest = start_addrs[np.maximum(tgt, 1) - 1].tolist()
+        for addr, found, start_addr in zip(unique_addrs, tgt.tolist(), closest):
+            if found == 0:
+                continue
+            symbol_name, end_addr = all_symbols[start_addr]
+            if start_addr <= addr <= end_addr:
+                addr_symbol_map[addr] = symbol_name
 
     symbols = []
     for addr in addr_list:
@@ -31,27 +31,38 @@ def run(command: str) -> None:
     check_call(command, shell=True)
 
 
+# test data files are downloaded and hashed in chunks of this size, rather
+# than whole
+CHUNK_SIZE = 1 << 20
+
+
+def __file_md5(path: str) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def __is_file_exist(path: str, md5: str) -> bool:
     if not os.path.exists(path):
         return False
-    with open(path, "rb") as f:
-        r = hashlib.md5(f.read())
-        if r.hexdigest() == md5:
-            return True
-    return False
+    return __file_md5(path) == md5
 
 
 def download_file(url: str, path: str, md5: str) -> None:
     if __is_file_exist(path, md5):
         return
 
-    resp = requests.get(url)
-    with open(path, "wb") as f:
-        f.write(resp.content)
+    # stream the file to disk, hashing it on the way, rather than holding
+    # it in memory and reading it back to check it
+    h = hashlib.md5()
+    with requests.get(url, stream=True) as resp, open(path, "wb") as f:
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            h.update(chunk)
+            f.write(chunk)
 
-    with open(path, "rb") as f:
-        r = hashlib.md5(f.read())
-        if r.hexdigest() == md5:
-            return
+    if h.hexdigest() == md5:
+        return
 
     raise Exception(f"md5 mismatch,url:{url}")
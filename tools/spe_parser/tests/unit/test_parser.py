@@ -0,0 +1,257 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) Arm Ltd. 2023
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from unittest import TestCase
+from unittest.mock import patch
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import spe_parser.errors as err
+from spe_parser.parser import (
+    OutputWriters,
+    RecordColumns,
+    args_init,
+    imap_bounded,
+    parse,
+    serialize_table,
+)
+from spe_parser.schema import (
+    BRANCH_SCHEMA,
+    LDST_SCHEMA,
+    get_branch_default_record,
+    get_ldst_default_record,
+)
+
+
+def branch_record(lat: int) -> bytes:
+    # PC, B COND, EV RETIRED, LAT ISSUE, LAT TOT, TGT and TS packets
+    return (
+        bytes.fromhex("b0 e0 43 21 bf fd 7f 00 80 4a 01 52 02 00")
+        + b"\x99"
+        + lat.to_bytes(2, "little")
+        + b"\x98"
+        + (lat + 1).to_bytes(2, "little")
+        + bytes.fromhex("b1 08 44 21 bf fd 7f 00 80")
+        + b"\x71"
+        + lat.to_bytes(8, "little")
+    )
+
+
+def load_record(ts: int) -> bytes:
+    # PC, LD GP-REG, EV, LAT ISSUE, LAT TOT, VA, LAT XLAT, PA, DATA-SOURCE and TS packets
+    return (
+        bytes.fromhex(
+            "b0 00 b6 a9 e4 aa aa 00 80 49 00 52 16 00 99 04 00 98 08 00 b2 43 da 5d e6 aa aa 00 00"
+            "9a 01 00 b3 43 5a 95 2c 03 08 00 80 43 00"
+        )
+        + b"\x71"
+        + ts.to_bytes(8, "little")
+    )
+
+
+def branch_table(lats) -> bytes:
+    records = RecordColumns(BRANCH_SCHEMA)
+    for lat in lats:
+        record = get_branch_default_record()
+        record["issue_lat"] = lat
+        records.append(record)
+    return serialize_table(records.to_table())
+
+
+class TestRecordColumns(TestCase):
+    def check_batches(self, schema, get_default_record):
+        records = RecordColumns(schema, batch_size=3)
+        for i in range(10):
+            record = get_default_record()
+            record["pc"] = hex(i)
+            record["ts"] = i
+            records.append(record)
+            self.assertEqual(len(records), i + 1)
+        # full batches are converted as they fill up
+        self.assertEqual(len(records.batches), 3)
+        self.assertEqual(len(records.rows), 1)
+
+        table = records.to_table()
+        self.assertEqual(table.schema, schema)
+        self.assertEqual(table.num_rows, 10)
+        self.assertEqual(table.column("pc").to_pylist(), [hex(i) for i in range(10)])
+        self.assertEqual(table.column("ts").to_pylist(), list(range(10)))
+        self.assertEqual(
+            table.to_pylist()[0], {**get_default_record(), "pc": "0x0", "ts": 0}
+        )
+
+    def test_ldst(self):
+        self.check_batches(LDST_SCHEMA, get_ldst_default_record)
+
+    def test_branch(self):
+        self.check_batches(BRANCH_SCHEMA, get_branch_default_record)
+
+    def test_empty(self):
+        table = RecordColumns(BRANCH_SCHEMA).to_table()
+        self.assertEqual(table.schema, BRANCH_SCHEMA)
+        self.assertEqual(table.num_rows, 0)
+
+
+class TestArgs(TestCase):
+    def parse_args(self, *args):
+        with patch.object(sys, "argv", ["spe-parser", *args]):
+            return args_init()
+
+    def test_batch_size(self):
+        self.assertEqual(
+            self.parse_args("perf.data", "--batch-size", "1").batch_size, 1
+        )
+
+    def test_invalid_batch_size(self):
+        for batch_size in ("0", "-1"):
+            with self.assertRaises(SystemExit), self.assertLogs(level="ERROR"):
+                self.parse_args("perf.data", "--batch-size", batch_size)
+
+
+class CountingPool:
+    # counts the items submitted to a thread pool
+    def __init__(self, pool: ThreadPool) -> None:
+        self.pool = pool
+        self.submitted = 0
+
+    def apply_async(self, func, args):
+        self.submitted += 1
+        return self.pool.apply_async(func, args)
+
+
+class TestImapBounded(TestCase):
+    def test_order_and_window(self):
+        finished = []
+        lock = threading.Lock()
+
+        def work(i):
+            # every 4th item is slow, so the items after it finish first
+            if i % 4 == 0:
+                time.sleep(0.02)
+            with lock:
+                finished.append(i)
+            return i * 10
+
+        window = 4
+        with ThreadPool(4) as pool:
+            counting_pool = CountingPool(pool)
+            results = []
+            max_held = 0
+            for result in imap_bounded(counting_pool, work, range(20), window):
+                results.append(result)
+                # submitted, but not yielded yet
+                max_held = max(max_held, counting_pool.submitted - len(results))
+
+        self.assertNotEqual(finished, sorted(finished))
+        self.assertEqual(results, [i * 10 for i in range(20)])
+        self.assertEqual(counting_pool.submitted, 20)
+        self.assertEqual(max_held, window)
+
+    def test_short_input(self):
+        with ThreadPool(2) as pool:
+            self.assertEqual(list(imap_bounded(pool, abs, [-1, -2], 8)), [1, 2])
+            self.assertEqual(list(imap_bounded(pool, abs, [], 8)), [])
+
+
+class TestOutputWriters(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tmp_dir.name, "spe")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        return super().tearDown()
+
+    def test_commit(self):
+        writers = OutputWriters(self.prefix, "parquet")
+        writers.write("br", branch_table([1, 2]))
+        writers.write("br", branch_table([3]))
+        with self.assertLogs(level="WARNING") as logs:
+            writers.commit(["br", "ldst"])
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["spe-br.parquet"])
+        table = pq.read_table(f"{self.prefix}-br.parquet")
+        self.assertEqual(table.column("issue_lat").to_pylist(), [1, 2, 3])
+        self.assertIn("WARNING:root:No ldst records found", logs.output)
+
+    def test_abort(self):
+        # the output of a previous run is left alone
+        with open(f"{self.prefix}-br.parquet", "w") as f:
+            f.write("previous")
+        writers = OutputWriters(self.prefix, "parquet")
+        writers.write("br", branch_table([1]))
+        writers.write("br", b"not an Arrow stream")
+        with self.assertRaises(pa.ArrowInvalid):
+            writers.close()
+        writers.abort()
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["spe-br.parquet"])
+        with open(f"{self.prefix}-br.parquet") as f:
+            self.assertEqual(f.read(), "previous")
+
+
+class TestParse(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.prefix = os.path.join(self.tmp_dir.name, "spe")
+        self.input_file = os.path.join(self.tmp_dir.name, "spe.data")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        return super().tearDown()
+
+    def parse_raw(self, data: bytes, output_type: str = "parquet") -> int:
+        with open(self.input_file, "wb") as f:
+            f.write(data)
+        return parse(
+            self.input_file,
+            parse_br=True,
+            parse_ldst=True,
+            parse_other=True,
+            parse_symbols=False,
+            parse_raw=True,
+            concurrency=2,
+            output_prefix=self.prefix,
+            output_type=output_type,
+        )
+
+    def test_parse_raw_buffer(self):
+        data = b"".join(branch_record(i) + load_record(i) for i in range(100))
+        self.assertEqual(self.parse_raw(data), 1)
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir.name)),
+            ["spe-br.parquet", "spe-ldst.parquet", "spe.data"],
+        )
+        br = pq.read_table(f"{self.prefix}-br.parquet")
+        self.assertEqual(br.column("issue_lat").to_pylist(), list(range(100)))
+        self.assertEqual(br.column("total_lat").to_pylist(), list(range(1, 101)))
+        ldst = pq.read_table(f"{self.prefix}-ldst.parquet")
+        self.assertEqual(ldst.column("op").to_pylist(), ["LD"] * 100)
+
+    def test_parse_raw_buffer_csv(self):
+        data = b"".join(branch_record(i) for i in range(3))
+        self.parse_raw(data, output_type="csv")
+        with open(f"{self.prefix}-br.csv") as f:
+            lines = f.read().splitlines()
+        # a header line, then one line per record
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            [line.split(",")[7] for line in lines],
+            ['"issue_lat"', "0", "1", "2"],
+        )
+
+    def test_parse_error(self):
+        # 0x02 is not a valid packet header
+        data = branch_record(1) + b"\x02\x00"
+        with self.assertLogs(level="INFO") as logs:
+            with self.assertRaises(err.ParseRegionError):
+                self.parse_raw(data)
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["spe.data"])
+        self.assertFalse([line for line in logs.output if "No br records" in line])
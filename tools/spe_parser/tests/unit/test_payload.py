@@ -4,7 +4,6 @@
 
 from unittest import TestCase, main
 
-import deepdiff
 import spe_parser.payload as payload
 
 
@@ -108,10 +107,7 @@ class TestBranch(TestCase):
 
         for i in range(len(input)):
             rec = payload.create_record(input[i], 54)
-            df = deepdiff.DeepDiff(output[i], rec.to_dict(), ignore_order=True)
-            if len(df) != 0:
-                print(df)
-            self.assertTrue(len(df) == 0)
+            self.assertEqual(output[i], rec.to_dict())
 
 
 class TestLoadStore(TestCase):
@@ -270,10 +266,7 @@ class TestLoadStore(TestCase):
 
         for i in range(len(input)):
             rec = payload.create_record(input[i], 0)
-            df = deepdiff.DeepDiff(output[i], rec.to_dict(), ignore_order=True)
-            if len(df) != 0:
-                print(df)
-            self.assertTrue(len(df) == 0)
+            self.assertEqual(output[i], rec.to_dict())
 
 
 class TestUnknownPacket(TestCase):
@@ -406,10 +399,7 @@ class TestOtherPacket(TestCase):
 
         for i in range(len(input)):
             rec = payload.create_record(input[i], 54)
-            df = deepdiff.DeepDiff(output[i], rec.to_dict(), ignore_order=True)
-            if len(df) != 0:
-                print(df)
-            self.assertTrue(len(df) == 0)
+            self.assertEqual(output[i], rec.to_dict())
 
 
 if __name__ == "__main__":
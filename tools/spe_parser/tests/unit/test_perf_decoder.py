@@ -14,9 +14,10 @@ def get_spe_regions_from_raw(path: str) -> int:
     # In the perf.raw file, each segment of SPE records begins
     # with "ARM SPE data". Therefore, the number of occurrences
     # of this string is used to determine the quantity of
-    # SPE record region
+    # SPE record region. The marker never spans lines, so the
+    # file is counted a line at a time rather than read at once
     with open(path) as f:
-        return f.read().count("ARM SPE data")
+        return sum(line.count("ARM SPE data") for line in f)
 
 
 class TestPerfDecoder(TestCase):
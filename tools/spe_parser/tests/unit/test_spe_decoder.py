@@ -5,11 +5,19 @@
 import io
 import json
 import logging
+import mmap
 from typing import List
 from unittest import TestCase
 
 from spe_parser.perf_decoder import get_spe_records_regions
-from spe_parser.spe_decoder import gen_mask, get_packets
+from spe_parser.spe_decoder import (
+    PktType,
+    decode_buffer,
+    decode_packets,
+    format_packet,
+    gen_mask,
+    get_packets,
+)
 from spe_parser.testutils import TESTDATA, cd, download_file
 
 
@@ -17,11 +25,14 @@ def decode_by_py_decoder(file_path: str) -> List[str]:
     # Parse a binary perf.data directly.
     regions = get_spe_records_regions(file_path)
     pkts = []
-    with open(file_path, "rb") as f:
+    # map the file once and decode each region from a view of the mapping,
+    # without copying it, the way the parser's read_region() does
+    with open(file_path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mm, memoryview(mm) as view:
         for region in regions:
-            f.seek(region["offset"])
-            spe_f = io.BytesIO(f.read(region["size"]))
-            pkts.extend(list(get_packets(spe_f)))
+            with view[region["offset"] : region["offset"] + region["size"]] as spe_buf:
+                pkts.extend(format_packet(pkt) for pkt in decode_buffer(spe_buf))
     return pkts
 
 
@@ -115,12 +126,14 @@ class TestGetPackets(TestCase):
             "b3 e8 09 8a d8 0b 08 00 80",
             "b2 c0 26 c2 07 20 fc ff 00",
             "b1 e0 89 8c 86 c2 c0 ff c0",
+            "b3 e8 09 8a d8 0b 08 00 c0",
         ]
         outputs = [
             "PC 0xffc0c2868c8b5c el2 ns=1",
             "PA 0x80bd88a09e8 ns=1 ch=0 pat=0",
             "VA 0xfffc2007c226c0",
             "TGT 0xffc0c2868c89e0 el2 ns=1",
+            "PA 0x80bd88a09e8 ns=1 ch=1 pat=0",
         ]
         self.assertTrue(check_single_packet(inputs, outputs))
 
@@ -238,6 +251,25 @@ class TestGetPackets(TestCase):
         ]
         self.assertTrue(check_packets(inputs, outputs))
 
+    def test_decode_packets(self):
+        fh = io.BytesIO(
+            hex_string_to_bytes(
+                "b0 00 b6 a9 e4 aa aa 00 80 49 00 52 16 00 99 04 00 43 00 4a 01 71 6c f8 a5 83 00 0c 00 00"
+            )
+        )
+        self.assertEqual(
+            list(decode_packets(fh)),
+            [
+                (PktType.PC, ["0xaaaae4a9b600", "el0", "ns=1"]),
+                (PktType.LD, ["GP-REG"]),
+                (PktType.EV, ["RETIRED", "L1D-ACCESS", "TLB-ACCESS"]),
+                (PktType.ISSUE, ["4"]),
+                (PktType.DATA_SOURCE, ["0"]),
+                (PktType.B, ["COND"]),
+                (PktType.TS, ["13196348225644"]),
+            ],
+        )
+
 
 class TestSPEHelperFunc(TestCase):
     def test_gen_mask(self):
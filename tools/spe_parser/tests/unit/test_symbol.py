@@ -2,10 +2,12 @@
 #
 # Copyright (C) Arm Ltd. 2023
 
-
+import os
+import sys
+import tempfile
 from unittest import TestCase, main, mock
 
-from spe_parser.symbols import search_symbols_by_addr_batch
+from spe_parser.symbols import get_mmap_loaded_symbols, search_symbols_by_addr_batch
 
 
 class TestParseSymbol(TestCase):
@@ -42,5 +44,40 @@ class TestParseSymbol(TestCase):
         self.assertEqual(outputs, search_symbols_by_addr_batch("", inputs, 1))
 
 
+class TestMmapLoadedSymbols(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.binary = os.path.join(self.tmp_dir.name, "binary")
+        self.dangling = os.path.join(self.tmp_dir.name, "dangling")
+        self.missing = os.path.join(self.tmp_dir.name, "missing")
+        os.symlink(os.path.realpath(sys.executable), self.binary)
+        os.symlink(os.path.join(self.tmp_dir.name, "nowhere"), self.dangling)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        return super().tearDown()
+
+    def check_not_found(self) -> None:
+        records = {(self.binary, 0), (self.dangling, 0), (self.missing, 0)}
+        with mock.patch(
+            "spe_parser.symbols.get_mmap_records", return_value=records
+        ), self.assertLogs(level="DEBUG") as logs:
+            symbols = get_mmap_loaded_symbols("perf.data", 1)
+        self.assertTrue(symbols)
+        not_found = sorted(
+            line.split()[1] for line in logs.output if "file not found" in line
+        )
+        self.assertEqual(not_found, [self.dangling, self.missing])
+
+    def test_not_found(self) -> None:
+        self.check_not_found()
+
+    def test_unreadable_dir(self) -> None:
+        # the records are checked one by one when the directory can't be listed
+        with mock.patch("spe_parser.symbols.os.scandir", side_effect=PermissionError):
+            self.check_not_found()
+
+
 if __name__ == "__main__":
     main()
@@ -5,6 +5,7 @@
 import json
 import os
 import sys
+from functools import lru_cache
 
 # Update path when running file/package directly (not as a module).
 if __name__ == "__main__" and not __package__:
@@ -14,6 +15,8 @@ from topdown_tool.utils import get_midr_string_windows
 
 
 MIDR_PATH = "/sys/devices/system/cpu/cpu0/regs/identification/midr_el1"
+MIDR_IMPLEMENTER_MASK = 0xff000
+MIDR_PART_NUM_MASK = 0xfff
 MAPPING_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics", "mapping.json")
 
 
@@ -34,9 +37,8 @@ def get_cpuid(midr_string=None, perf_path=None):
         midr_string = get_midr_string_linux() if sys.platform == "linux" else get_midr_string_windows(perf_path)
 
     midr = int(midr_string, 16)
-    implementer = (midr & 0xff000000) >> 24
-    part_num = (midr & 0x0000fff0) >> 4
-    return (implementer << 12) + part_num
+    # implementer (bits 31:24) above part num (bits 15:4)
+    return ((midr >> 12) & MIDR_IMPLEMENTER_MASK) | ((midr >> 4) & MIDR_PART_NUM_MASK)
 
 
 def get_cpu(midr_string=None, perf_path=None):
@@ -52,8 +54,11 @@ def get_cpu(midr_string=None, perf_path=None):
     return cpu
 
 
+@lru_cache(maxsize=1)
 def read_cpus():
-    """Returns a dict of cpuid => CPU name by fetching metadata from Arm's github repo"""
+    """Returns a dict of cpuid => CPU name by fetching metadata from Arm's github repo
+
+    The mapping file is only read once, the returned dict is shared and must not be modified."""
     with open(MAPPING_FILE_PATH, encoding="utf-8") as f:
         cpus_json = json.load(f)
     return {int(cpuid, 16): cpu["name"] for cpuid, cpu in cpus_json.items()}